@@ -1,64 +1,88 @@
 import word_graph as wg
 import test_framework as test
+import search_context
+import profiling
+import result_cache
 import argparse
+import heapq
 
-# Parse arguments
-parser = argparse.ArgumentParser(description='A-Star solution to word ladder problem, please read documentation.')
-parser.add_argument("-v", "--verbose", help="If set, print extra info", action="store_true")
-parser.add_argument("--test", help="Which test to run: 0=simple, 1=full, 2=difficult words", type=int, default=1)
-parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of games)", type=int, default=-1)
-parser.add_argument("--wordfile", help="A text file to parse into list of words", type=str, default="")
-args = parser.parse_args()
-
-test.set_verbose(args.verbose)
-wg.set_random_seed(None if args.seed == -1 else args.seed)
-
-# This implementation of Node is specific to the A-Star algorithm. It contains data that's not shared
-# with other algorithms.
-class AStarNode(wg.Node):
-
-    open_list = []  # Known nodes where we haven't examined neighbors
-    closed_list = []  # Known nodes where we've examined neighbors
-
-    def __init__(self, word):
-        super().__init__(word)
-        self.open_list_flag = False
-        self.closed_list_flag = False
-        self.cost = 1000000
-        self.est = 0
-        self.parent = None
-
-    # Call before each running of the algorithm
-    @staticmethod
-    def reset_lists():
-        AStarNode.open_list.clear()
-        AStarNode.closed_list.clear()
-        for n in wg.Node.node_list:
-            n.open_list_flag = False
-            n.closed_list_flag = False
-            n.cost = 1000000
-            n.est = 1000000
-            n.parent = None
-
-    # Returns the most promising node from the open list, according to the general rules of A-Star
-    @staticmethod
-    def pop_best_open_node():
-        index = 0
-        lowest_score = 1000000
-        for i, n in enumerate(AStarNode.open_list):
-            score = n.cost + n.est
-            if score < lowest_score:
-                lowest_score = score
-                index = i
-        return AStarNode.open_list.pop(index)
-
-
-def node_factory(word):
-    return AStarNode(word)
-
-wg.Node.set_factory_func(node_factory)
-wg.create_nodes(None if len(args.wordfile) == 0 else args.wordfile)
-test.preliminary_test()
+# The open list contains known words where we haven't examined the neighbors yet. A-Star always wants the word
+# with the lowest cost + estimate. When two words tie, the one that went into the list first wins. Entries are
+# word IDs, and every search makes a new open list, so searches don't share anything.
+
+# The original open list: a plain list that is scanned for the best word every time. Simple, but each pop
+# costs O(n), which adds up on large dictionaries. Scores are kept in a dictionary, which also keeps the words in
+# the order they went in.
+class ScanOpenList(object):
+
+    def __init__(self):
+        self.scores = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def push(self, idx, score):
+        self.scores[idx] = score
+
+    # Called when a word already in the list gets a lower score. It keeps its place in the list.
+    def update(self, idx, score):
+        self.scores[idx] = score
+
+    # Returns the most promising word from the open list, according to the general rules of A-Star
+    def pop(self):
+        idx = min(self.scores, key=self.scores.__getitem__)
+        del self.scores[idx]
+        return idx
+
+# A binary heap version of the open list. Each entry is (score, sequence number, word ID). The sequence number
+# breaks ties in insertion order, so words come out in exactly the same order as from ScanOpenList.
+#
+# Pushing a word that is already in the heap (e.g. because it got cheaper) doesn't search for the old entry.
+# The list remembers the sequence number of each word's newest entry and stale entries are thrown away when
+# they reach the top (lazy invalidation).
+class HeapOpenList(object):
+
+    def __init__(self):
+        self.heap = []
+        self.sequence = 0
+        self.sequences = {}  # word ID -> sequence number of its newest entry
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def push(self, idx, score):
+        self.sequence = self.sequence + 1
+        self.sequences[idx] = self.sequence
+        heapq.heappush(self.heap, (score, self.sequence, idx))
+
+    # Called when a word already in the heap gets a lower score (decrease-key)
+    def update(self, idx, score):
+        self.push(idx, score)
+
+    def pop(self):
+        while True:
+            score, sequence, idx = heapq.heappop(self.heap)
+            if self.sequences.get(idx) == sequence:
+                del self.sequences[idx]
+                return idx
+
+OPEN_LISTS = {"heap": HeapOpenList, "scan": ScanOpenList}
+
+engine = "heap"  # Which open list to use, see OPEN_LISTS
+heuristic = "hamming"  # How the remaining distance is estimated: "hamming" or "alt" (landmarks)
+
+# Chooses the open list implementation, "heap" or "scan"
+def set_engine(new_engine):
+    global engine
+    engine = new_engine
+
+def set_heuristic(new_heuristic):
+    global heuristic
+    heuristic = new_heuristic
+
+# Where a word stands in the search (only meaningful if it's been stamped by the current search)
+IN_OPEN_LIST = 1
+IN_CLOSED_LIST = 2
 
 # A-star Solution
 # --------------------------------------------
@@ -79,80 +103,200 @@ test.preliminary_test()
 # the open list is processed, neighbors are discovered and added to the end of the open list, and processed nodes are
 # put in the closed list.
 #
-# If a neighbor being examined is already in the closed list, but we have a cheaper way of getting to it, we update
-# that neighbor's cost and set a pointer back to the node we got there from.
-
-def solve_a_star(src, dest):
+# If a neighbor being examined is already in the open or closed list, but we have a cheaper way of getting to it, we
+# update that neighbor's cost and set a pointer back to the node we got there from.
+#
+# The estimate is either the number of letters that differ between a word and the goal ("hamming"), or the better
+# of that and the landmark estimate ("alt", see WordGraph.compute_landmarks). Neither ever overestimates, so the
+# solution found is always the shortest, but the landmark estimate is much closer, so far fewer nodes get examined.
 
-    AStarNode.reset_lists()
-    open_list = AStarNode.open_list
-    closed_list = AStarNode.closed_list
+# The search state (costs, estimates, parents and which list each word is in) lives in a search context (see
+# search_context.py), so any number of searches can run on the same graph at once. By default, the calling
+# thread's context is used.
+def solve_a_star(src, dest, context=None):
+    if context is None:
+        context = search_context.get_context()
+    generation = context.begin(wg.Node.graph)
+    stamps = context.stamps
+    states = context.get_array("astar_state", 'b')
+    costs = context.get_array("astar_cost")
+    ests = context.get_array("astar_est")
+    parents = context.get_array("astar_parent")
+    open_list = OPEN_LISTS[engine]()
+    # Counters (see search_context.set_collect_counters). These are cheap enough to keep always, and are only
+    # handed over at the end.
+    closed_count = 0
+    open_list_peak = 0
+    decreased_count = 0  # words in the open list that were reached more cheaply
+    reopened_count = 0  # words in the closed list that were reached more cheaply
+    pruned_count = 0  # neighbors left out because they can't beat the best solution
 
-    src.cost = 0
-    src.open_list_flag = True
-    open_list.append(src)
+    stamps[src.id] = generation
+    states[src.id] = IN_OPEN_LIST
+    costs[src.id] = 0
+    ests[src.id] = 1000000
+    parents[src.id] = -1
+    open_list.push(src.id, 1000000)
 
     final_node = None
     best_solution = 10000000
     worst_cost = 0
 
-    # Helper function to change cost and estimate associated with next_node, also setting a pointer
-    # back to prev_node
-    def _set_node_values(next_node, prev_node):
-        next_node.cost = prev_node.cost + 1
+    node_list = wg.Node.node_list
+    graph = wg.Node.graph
+    get_neighbor_ids = graph.get_neighbor_ids
+    if heuristic == "hamming" and not graph.cross_length:
+        # Straight from the packed words (see PACKED WORDS in word_graph.py), without making a node
+        codes = graph.get_word_codes()
+        dest_code = codes[dest.id]
+        get_code_distance = wg.get_code_distance
+        def _estimate(idx):
+            return get_code_distance(codes[idx], dest_code)
+    else:
+        estimate = wg.Node.get_landmark_estimate if heuristic == "alt" else wg.Node.get_word_distance
+        def _estimate(idx):
+            return estimate(node_list[idx], dest)
+
+    # Helper function to change cost and estimate associated with next_id, also setting a pointer
+    # back to prev_id
+    def _set_node_values(next_id, prev_id):
+        costs[next_id] = costs[prev_id] + 1
         # get estimate of cost remaining
-        next_node.est = next_node.get_word_distance(dest)
-        next_node.parent = prev_node
+        ests[next_id] = _estimate(next_id)
+        parents[next_id] = prev_id
 
-    while len(open_list) > 0:
-        node = AStarNode.pop_best_open_node()
-        node.open_list_flag = False
+    dest_id = dest.id
+    open_size = len(open_list)
+    while open_size > 0:
+        if open_size > open_list_peak:
+            open_list_peak = open_size
+        node_id = open_list.pop()
+        states[node_id] = 0
+        node_cost = costs[node_id]
+        if final_node is not None and node_cost + ests[node_id] >= best_solution:
+            # Words come out of the open list in order of cost + estimate, and the estimate never overestimates,
+            # so nothing left in the list can lead to a better solution
+            break
         # Go through neighbors
-        for neighbor in node.neighbors:
-            if neighbor.open_list_flag: # if in open_list
-                pass
-            elif neighbor.closed_list_flag: # if in closed_list
-                if neighbor.cost > node.cost + 1:
+        for neighbor_id in get_neighbor_ids(node_id):
+            if stamps[neighbor_id] != generation:
+                # First time this search has seen the neighbor
+                stamps[neighbor_id] = generation
+                states[neighbor_id] = 0
+            state = states[neighbor_id]
+            if state == IN_OPEN_LIST:
+                if costs[neighbor_id] > node_cost + 1:
+                    # We've found a cheaper way to a word that's still waiting in the open list
+                    _set_node_values(neighbor_id, node_id)
+                    open_list.update(neighbor_id, costs[neighbor_id] + ests[neighbor_id])
+                    decreased_count = decreased_count + 1
+                    if neighbor_id == dest_id:
+                        if costs[neighbor_id] < best_solution:
+                            best_solution = costs[neighbor_id]
+            elif state == IN_CLOSED_LIST:
+                if costs[neighbor_id] > node_cost + 1:
                     # We've found a more efficient way to get to this neighbor
-                    _set_node_values(neighbor, node)
-                    if neighbor is dest:
-                        if neighbor.cost < best_solution:
-                            best_solution = neighbor.cost
+                    _set_node_values(neighbor_id, node_id)
+                    reopened_count = reopened_count + 1
+                    if neighbor_id == dest_id:
+                        if costs[neighbor_id] < best_solution:
+                            best_solution = costs[neighbor_id]
             else:
                 # Neighbor not in open or closed list
-                _set_node_values(neighbor, node)
-                if neighbor is dest:
+                _set_node_values(neighbor_id, node_id)
+                neighbor_cost = costs[neighbor_id]
+                if neighbor_id == dest_id:
                     # This is the solution
-                    final_node = neighbor
-                    if neighbor.cost < best_solution:
-                        best_solution = neighbor.cost
-                    if neighbor.cost > worst_cost:
-                        worst_cost = neighbor.cost
-                if neighbor.cost + neighbor.est <= best_solution:
+                    final_node = dest
+                    if neighbor_cost < best_solution:
+                        best_solution = neighbor_cost
+                    if neighbor_cost > worst_cost:
+                        worst_cost = neighbor_cost
+                if neighbor_cost + ests[neighbor_id] <= best_solution:
                     # We only visit it if there's hope of beating the best solution found so far
-                    neighbor.open_list_flag = True
-                    open_list.append(neighbor)
-        node.closed_list_flag = True
-        closed_list.append(node)
+                    states[neighbor_id] = IN_OPEN_LIST
+                    open_list.push(neighbor_id, neighbor_cost + ests[neighbor_id])
+                else:
+                    pruned_count = pruned_count + 1
+        states[node_id] = IN_CLOSED_LIST
+        closed_count = closed_count + 1
+        open_size = len(open_list)
 
     out_list = []
-    while final_node is not None:
-        out_list.insert(0, final_node)
-        final_node = final_node.parent
-    #print("Output list for {} to {} is: ".format(src, dest), wg.string_list(out_list))
-    test.info("Closed list size {}, best cost {}, worst cost {}".format(len(closed_list), best_solution, worst_cost))
+    idx = -1 if final_node is None else final_node.id
+    while idx != -1:
+        out_list.insert(0, node_list[idx])
+        idx = parents[idx]
+    if context.counters is not None:
+        context.counters.update({'expanded': closed_count, 'open_list_peak': open_list_peak,
+                                 'decreased': decreased_count, 'reopened': reopened_count, 'pruned': pruned_count,
+                                 'best_cost': best_solution if final_node is not None else None,
+                                 'worst_cost': worst_cost})
     return out_list
 
 def do_word_ladder(src, dest, max_dist=20):
-    if len(src) != len(dest): return None
+    if len(src) != len(dest) and not wg.Node.graph.cross_length: return None
     src_node = wg.Node.find_node(src)
     if src_node is None: return None
     dest_node = wg.Node.find_node(dest)
     if dest_node is None or dest_node is src_node: return None
+    # No search can cross between networks (and landmark estimates only make sense within one)
+    if src_node.network_number != dest_node.network_number: return None
     result = solve_a_star(src_node, dest_node)
     if result is None or len(result) == 0: return None
     str_list = wg.string_list(result)
     return str_list
 
-test.set_word_ladder_func(do_word_ladder)
-test.run_test(args.test)
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='A-Star solution to word ladder problem, please read documentation.')
+    parser.add_argument("-v", "--verbose", help="If set, print extra info", action="store_true")
+    parser.add_argument("--test", help="Which test to run: 0=simple, 1=full, 2=difficult words, 3=impossible pairs", type=int, default=1)
+    parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of games)", type=int, default=-1)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    parser.add_argument("--lazy", help="If set, work out each word's neighbors the first time they're needed, instead of building the whole graph",
+                        action="store_true")
+    parser.add_argument("--neighbor_cache", help="With --lazy, the number of words whose neighbors are kept (default: {})".format(wg.DEFAULT_NEIGHBOR_CACHE_SIZE),
+                        type=int, default=None)
+    parser.add_argument("--shard_dir", help="Split the graph into shards by word length, kept in this directory. Shards are built there if needed, and each is loaded when first used",
+                        type=str, default="")
+    parser.add_argument("--shard_workers", help="Number of processes building shards at once (default: one per core)", type=int,
+                        default=None)
+    parser.add_argument("--result_cache", help="An SQLite file of answers to games already played, shared by all runs and processes",
+                        type=str, default="")
+    parser.add_argument("--result_cache_mb", help="Size limit of the result cache, in megabytes", type=int, default=256)
+    parser.add_argument("--engine", help="Open list implementation: heap (default) or scan", type=str, default="heap",
+                        choices=["heap", "scan"])
+    parser.add_argument("--heuristic", help="Distance estimate: hamming (letters that differ, default) or alt (landmarks)",
+                        type=str, default="hamming", choices=["hamming", "alt"])
+    parser.add_argument("--landmarks", help="Number of landmarks per network for --heuristic alt", type=int, default=16)
+    parser.add_argument("--counters", help="If set, count what the search does and print it after each game",
+                        action="store_true")
+    parser.add_argument("--profile", help="Run each game under a profiler and print its report", type=str,
+                        choices=profiling.PROFILERS)
+    args = parser.parse_args()
+
+    test.set_verbose(args.verbose)
+    test.set_counters(args.counters)
+    test.set_profiler(args.profile)
+    wg.set_random_seed(None if args.seed == -1 else args.seed)
+
+    set_engine(args.engine)
+    set_heuristic(args.heuristic)
+    wg.create_nodes(args.wordfile,
+                    None if len(args.graphfile) == 0 else args.graphfile,
+                    args.landmarks if args.heuristic == "alt" else 0,
+                    cross_length=args.cross_length, lazy=args.lazy, neighbor_cache_size=args.neighbor_cache,
+                    shard_dir=None if len(args.shard_dir) == 0 else args.shard_dir, shard_workers=args.shard_workers)
+    test.preliminary_test()
+    if len(args.result_cache) > 0:
+        cache = result_cache.ResultCache(args.result_cache, args.result_cache_mb * 1024 * 1024)
+        test.set_word_ladder_func(result_cache.cached_solver(cache, "astar", do_word_ladder))
+    else:
+        test.set_word_ladder_func(do_word_ladder)
+    test.run_test(args.test)
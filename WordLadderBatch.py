@@ -0,0 +1,192 @@
+import word_graph as wg
+import solvers
+import tree_cache
+import result_cache
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+
+# BATCH QUERIES
+# -------------------------------------------------------
+#
+# Runs a large number of word ladder games without any of the printing done by the test framework. Queries are
+# read one per line, either as "SRC DEST" / "SRC DEST MAX_DIST" or as a JSON object with "src", "dest" and
+# (optionally) "max_dist" keys. Blank lines and lines starting with "#" are skipped. Results are written as one
+# JSON object per line, in the same order as the queries. A line that can't be read as a query gets a result of
+# its own, {"error": ..., "line": ...}, in its place, and the rest of the batch carries on.
+#
+# The work is spread over a pool of worker processes. The graph is built once, in this process, before the pool
+# is started. Where the operating system supports fork, the workers inherit the graph as copy-on-write memory, so
+# it is never rebuilt or sent down a pipe. (When the graph comes from a --graphfile, its arrays are a shared
+# memory mapping in any case.) Where fork isn't available, each worker loads the graph itself when it starts.
+#
+# With --tree_cache, games are answered from a cache of breadth-first search trees instead of by the solver (see
+# tree_cache.py). This is much faster when many games share a start or goal word. Each worker has its own cache.
+#
+# With --result_cache, the answer to every game is kept in a file (see result_cache.py), which all the workers, and
+# later runs, share. A game that has been played before is answered from the file, without running the solver.
+
+solver = None
+cache = None
+results = None
+do_word_ladder = None  # runs one game, with whichever of the above are in use
+
+# Turns one line of input into a (src, dest, max_dist) tuple, or None if there's nothing on the line
+def parse_query(line, default_max_dist):
+    line = line.strip()
+    if len(line) == 0 or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        fields = json.loads(line)
+        return fields["src"].upper(), fields["dest"].upper(), int(fields.get("max_dist", default_max_dist))
+    fields = line.split()
+    if len(fields) < 2 or len(fields) > 3:
+        raise ValueError("Expected 'SRC DEST [MAX_DIST]', got: {}".format(line))
+    max_dist = int(fields[2]) if len(fields) == 3 else default_max_dist
+    return fields[0].upper(), fields[1].upper(), max_dist
+
+# Yields the queries in a stream. In place of a line that isn't a query, yields a dictionary of the error and the
+# line number, which solve_query() passes through as the result.
+def read_queries(stream, default_max_dist):
+    for line_number, line in enumerate(stream, 1):
+        try:
+            query = parse_query(line, default_max_dist)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # ValueError also covers malformed JSON. The others come from JSON that isn't an object with strings
+            # for src and dest.
+            yield {'error': "Bad query, {}: {}".format(type(e).__name__, e), 'line': line_number}
+            continue
+        if query is not None:
+            yield query
+
+# Raised by solve_query() when a game runs out of time
+class QueryTimeout(Exception):
+    pass
+
+def raise_query_timeout(signal_number, frame):
+    raise QueryTimeout()
+
+# Runs one game. Returns the result as a line of JSON, so the worker (not the main process) does the encoding.
+#
+# If time_limit is given, the game is stopped after that many seconds by raising QueryTimeout in the middle of the
+# solver, from a timer signal. The solvers keep their state for one search in a search context (see
+# search_context.py) that the next search starts afresh, so a search stopped half way leaves nothing behind. Timer
+# signals only exist on Unix, and only reach the main thread, so anywhere else there's no time limit.
+def solve_query(query, time_limit=None):
+    if isinstance(query, dict):
+        return json.dumps(query)  # a line that wasn't a query (see read_queries)
+    src, dest, max_dist = query
+    if time_limit is None or not hasattr(signal, "setitimer") or \
+            threading.current_thread() is not threading.main_thread():
+        ladder = do_word_ladder(src, dest, max_dist=max_dist)
+    else:
+        old_handler = signal.signal(signal.SIGALRM, raise_query_timeout)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+        try:
+            ladder = do_word_ladder(src, dest, max_dist=max_dist)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+    return json.dumps({'src': src, 'dest': dest, 'max_dist': max_dist, 'ladder': ladder})
+
+# Sets up the solver (or tree cache), the result cache and the graph in this process
+def load(solver_name, word_file, graph_file, cache_entries=0, cache_megabytes=0, cross_length=False, lazy=False,
+         neighbor_cache_size=None, shard_dir=None, shard_workers=None, result_cache_file=None,
+         result_cache_megabytes=256):
+    global solver, cache, results, do_word_ladder
+    solver = solvers.load_solver(solver_name)
+    wg.create_nodes(word_file, graph_file, cross_length=cross_length, lazy=lazy, neighbor_cache_size=neighbor_cache_size,
+                    shard_dir=shard_dir, shard_workers=shard_workers)
+    solvers.prepare_solver(solver)
+    if cache_entries > 0:
+        cache = tree_cache.TreeCache(cache_entries, cache_megabytes * 1024 * 1024)
+        do_word_ladder = cache.do_word_ladder
+    else:
+        do_word_ladder = solver.do_word_ladder
+    if result_cache_file is not None:
+        results = result_cache.ResultCache(result_cache_file, result_cache_megabytes * 1024 * 1024)
+        # Tree cache answers are shortest ladders, but not necessarily the ones the solver would give
+        do_word_ladder = result_cache.cached_solver(results, "tree_cache" if cache is not None else solver_name,
+                                                    do_word_ladder)
+
+# Solves the queries and writes the results. Queries are handed to the pool a block at a time, so neither the
+# input nor the output is ever held in memory all at once.
+def run_batch(queries, out_stream, pool=None, chunk_size=256):
+    block_size = chunk_size * 64
+    while True:
+        block = list(itertools.islice(queries, block_size))
+        if len(block) == 0:
+            break
+        results = map(solve_query, block) if pool is None else pool.imap(solve_query, block, chunk_size)
+        for result in results:
+            out_stream.write(result)
+            out_stream.write("\n")
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Runs many word ladder games, writing the results as JSON lines.')
+    parser.add_argument("--solver", help="Which solution to use", type=str, default="astar",
+                        choices=solvers.get_solver_names())
+    parser.add_argument("--input", help="File of queries, one per line ('-' for stdin)", type=str, default="-")
+    parser.add_argument("--output", help="File to write results to ('-' for stdout)", type=str, default="-")
+    parser.add_argument("--workers", help="Number of worker processes, 1 to run everything in this process", type=int,
+                        default=os.cpu_count())
+    parser.add_argument("--chunksize", help="Number of queries handed to a worker at a time", type=int, default=256)
+    parser.add_argument("--max_dist", help="Maximum ladder length, for queries that don't give one", type=int, default=20)
+    parser.add_argument("--tree_cache", help="Answer from a cache of up to this many search trees (0 = use the solver)",
+                        type=int, default=0)
+    parser.add_argument("--tree_cache_mb", help="Memory limit of the tree cache, in megabytes", type=int, default=256)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    parser.add_argument("--lazy", help="If set, work out each word's neighbors the first time they're needed, instead of building the whole graph",
+                        action="store_true")
+    parser.add_argument("--neighbor_cache", help="With --lazy, the number of words whose neighbors are kept (default: {})".format(wg.DEFAULT_NEIGHBOR_CACHE_SIZE),
+                        type=int, default=None)
+    parser.add_argument("--shard_dir", help="Split the graph into shards by word length, kept in this directory. Shards are built there if needed, and each is loaded when first used",
+                        type=str, default="")
+    parser.add_argument("--shard_workers", help="Number of processes building shards at once (default: one per core)", type=int,
+                        default=None)
+    parser.add_argument("--result_cache", help="An SQLite file of answers to games already played, shared by all runs and processes",
+                        type=str, default="")
+    parser.add_argument("--result_cache_mb", help="Size limit of the result cache, in megabytes", type=int, default=256)
+    args = parser.parse_args()
+
+    word_file = args.wordfile
+    graph_file = None if len(args.graphfile) == 0 else args.graphfile
+
+    in_stream = sys.stdin if args.input == "-" else open(args.input)
+    out_stream = sys.stdout if args.output == "-" else open(args.output, "w")
+    queries = read_queries(in_stream, args.max_dist)
+    load_args = (args.solver, word_file, graph_file, args.tree_cache, args.tree_cache_mb, args.cross_length,
+                 args.lazy, args.neighbor_cache, None if len(args.shard_dir) == 0 else args.shard_dir, args.shard_workers,
+                 None if len(args.result_cache) == 0 else args.result_cache, args.result_cache_mb)
+
+    if args.workers <= 1:
+        load(*load_args)
+        run_batch(queries, out_stream, chunk_size=args.chunksize)
+        if cache is not None:
+            print("Tree cache:", cache.get_stats(), file=sys.stderr)
+        if results is not None:
+            print("Result cache:", results.get_stats(), file=sys.stderr)
+    elif "fork" in multiprocessing.get_all_start_methods():
+        load(*load_args)
+        with multiprocessing.get_context("fork").Pool(args.workers) as pool:
+            run_batch(queries, out_stream, pool, args.chunksize)
+    else:
+        with multiprocessing.Pool(args.workers, initializer=load, initargs=load_args) as pool:
+            run_batch(queries, out_stream, pool, args.chunksize)
+
+    out_stream.flush()
+    if out_stream is not sys.stdout:
+        out_stream.close()
+    if in_stream is not sys.stdin:
+        in_stream.close()
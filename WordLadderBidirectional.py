@@ -0,0 +1,134 @@
+import word_graph as wg
+import test_framework as test
+import result_cache
+import argparse
+
+# BIDIRECTIONAL BREADTH-FIRST SOLUTION
+# -------------------------------------------------------
+#
+# Every step in the game costs the same (one letter change), so the first time a breadth-first search reaches
+# a node, it has found the shortest route to it. No estimates or re-visiting are needed.
+#
+# A plain breadth-first search from the start word grows a ball of visited nodes around it until the ball touches
+# the goal. Here, we grow two balls instead: one from the start word and one from the goal. They only need to
+# grow half as far before touching each other, and because the number of nodes in a ball grows very quickly with
+# its radius, two half-size balls are much smaller than one full-size ball.
+#
+# At each step we grow whichever ball has the smaller frontier (the nodes at its edge). A layer is always
+# finished before we stop, so that the shortest of all the meeting points found in that layer is used.
+
+# Expands one whole layer of a search. parents holds every node seen by this side of the search, mapped to the
+# node it was reached from. other_parents is the same thing for the opposite side.
+# Returns the new frontier and the best meeting node found (or None)
+def expand_layer(frontier, parents, other_parents, other_depths):
+    next_frontier = []
+    meeting_node = None
+    for node in frontier:
+        for neighbor in node.neighbors:
+            if neighbor in parents:
+                continue
+            parents[neighbor] = node
+            next_frontier.append(neighbor)
+            if neighbor in other_parents:
+                if meeting_node is None or other_depths[neighbor] < other_depths[meeting_node]:
+                    meeting_node = neighbor
+    return next_frontier, meeting_node
+
+# Returns a list of nodes from src to dest, or None if there is no route of max_dist steps or fewer
+def solve_bidirectional(src, dest, max_dist):
+    src_parents = {src: None}
+    dest_parents = {dest: None}
+    src_depths = {src: 0}
+    dest_depths = {dest: 0}
+    src_frontier = [src]
+    dest_frontier = [dest]
+    src_depth = 0
+    dest_depth = 0
+
+    meeting_node = None
+    while len(src_frontier) > 0 and len(dest_frontier) > 0 and src_depth + dest_depth < max_dist:
+        if len(src_frontier) <= len(dest_frontier):
+            src_frontier, meeting_node = expand_layer(src_frontier, src_parents, dest_parents, dest_depths)
+            src_depth = src_depth + 1
+            for n in src_frontier:
+                src_depths[n] = src_depth
+        else:
+            dest_frontier, meeting_node = expand_layer(dest_frontier, dest_parents, src_parents, src_depths)
+            dest_depth = dest_depth + 1
+            for n in dest_frontier:
+                dest_depths[n] = dest_depth
+        if meeting_node is not None:
+            break
+
+    test.info("Visited {} nodes".format(len(src_parents) + len(dest_parents)))
+    if meeting_node is None:
+        return None
+    if src_depths[meeting_node] + dest_depths[meeting_node] > max_dist:
+        return None
+
+    # Walk back to the start word, then forward to the goal
+    out_list = []
+    node = meeting_node
+    while node is not None:
+        out_list.insert(0, node)
+        node = src_parents[node]
+    node = dest_parents[meeting_node]
+    while node is not None:
+        out_list.append(node)
+        node = dest_parents[node]
+    return out_list
+
+def do_word_ladder(src, dest, max_dist=20):
+    if len(src) != len(dest) and not wg.Node.graph.cross_length: return None
+    src_node = wg.Node.find_node(src)
+    if src_node is None: return None
+    dest_node = wg.Node.find_node(dest)
+    if dest_node is None or dest_node is src_node: return None
+    if src_node.network_number != dest_node.network_number: return None
+    result = solve_bidirectional(src_node, dest_node, max_dist)
+    if result is None: return None
+    str_list = wg.string_list(result)
+    return str_list
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Bidirectional breadth-first solution to word ladder problem, please read documentation.')
+    parser.add_argument("-v", "--verbose", help="If set, print extra info", action="store_true")
+    parser.add_argument("--test", help="Which test to run: 0=simple, 1=full, 2=difficult words, 3=impossible pairs", type=int, default=1)
+    parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of games)", type=int, default=-1)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    parser.add_argument("--lazy", help="If set, work out each word's neighbors the first time they're needed, instead of building the whole graph",
+                        action="store_true")
+    parser.add_argument("--neighbor_cache", help="With --lazy, the number of words whose neighbors are kept (default: {})".format(wg.DEFAULT_NEIGHBOR_CACHE_SIZE),
+                        type=int, default=None)
+    parser.add_argument("--shard_dir", help="Split the graph into shards by word length, kept in this directory. Shards are built there if needed, and each is loaded when first used",
+                        type=str, default="")
+    parser.add_argument("--shard_workers", help="Number of processes building shards at once (default: one per core)", type=int,
+                        default=None)
+    parser.add_argument("--result_cache", help="An SQLite file of answers to games already played, shared by all runs and processes",
+                        type=str, default="")
+    parser.add_argument("--result_cache_mb", help="Size limit of the result cache, in megabytes", type=int, default=256)
+    args = parser.parse_args()
+
+    test.set_verbose(args.verbose)
+    wg.set_random_seed(None if args.seed == -1 else args.seed)
+
+    # This algorithm keeps its search state in dictionaries, so the plain Node class is all it needs.
+    wg.create_nodes(args.wordfile,
+                    None if len(args.graphfile) == 0 else args.graphfile,
+                    cross_length=args.cross_length, lazy=args.lazy,
+                    neighbor_cache_size=args.neighbor_cache,
+                    shard_dir=None if len(args.shard_dir) == 0 else args.shard_dir,
+                    shard_workers=args.shard_workers)
+    test.preliminary_test()
+    if len(args.result_cache) > 0:
+        cache = result_cache.ResultCache(args.result_cache, args.result_cache_mb * 1024 * 1024)
+        test.set_word_ladder_func(result_cache.cached_solver(cache, "bidirectional", do_word_ladder))
+    else:
+        test.set_word_ladder_func(do_word_ladder)
+    test.run_test(args.test)
@@ -0,0 +1,52 @@
+import word_graph as wg
+import ladder_enumeration
+import argparse
+import json
+import os
+import sys
+
+# LISTING LADDERS
+# -------------------------------------------------------
+#
+# Prints every shortest ladder between two words, or the k shortest ladders, one JSON list per line (see
+# ladder_enumeration.py). Ladders are printed as they are found, so a pair with millions of shortest ladders can
+# be piped straight into another program.
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Lists the shortest ladders between two words, as JSON lines.')
+    parser.add_argument("src", help="The start word", type=str)
+    parser.add_argument("dest", help="The goal word", type=str)
+    parser.add_argument("--k", help="List the k shortest ladders (including longer ones) instead of all the shortest",
+                        type=int, default=0)
+    parser.add_argument("--count", help="Only print the number of shortest ladders", action="store_true")
+    parser.add_argument("--max_dist", help="Maximum ladder length", type=int, default=20)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    args = parser.parse_args()
+
+    wg.create_nodes(args.wordfile,
+                    None if len(args.graphfile) == 0 else args.graphfile,
+                    cross_length=args.cross_length)
+    src = args.src.upper()
+    dest = args.dest.upper()
+    if args.count:
+        print(ladder_enumeration.count_shortest_ladders(src, dest, args.max_dist))
+    else:
+        if args.k > 0:
+            ladders = ladder_enumeration.k_shortest_ladders(src, dest, args.k, args.max_dist)
+        else:
+            ladders = ladder_enumeration.all_shortest_ladders(src, dest, args.max_dist)
+        try:
+            for ladder in ladders:
+                sys.stdout.write(json.dumps(ladder))
+                sys.stdout.write("\n")
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Whatever was reading the ladders (e.g. head) has had enough. Point stdout at nothing, so that Python
+            # doesn't complain when it flushes it on the way out.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
@@ -0,0 +1,79 @@
+import word_graph as wg
+import test_framework as test
+import distance_oracle
+import tree_cache
+import argparse
+
+# DISTANCE ORACLE SOLUTION
+# -------------------------------------------------------
+#
+# After the graph is built, the distance between every pair of words in each network is worked out ahead of time
+# and stored in a matrix (see distance_oracle.py). A game is then answered without any searching: the matrix says
+# how many steps the shortest ladder takes, and the ladder is read off by always stepping to a neighbor that is
+# one step closer to the goal.
+#
+# This only pays off when there are lots of games to play on the same dictionary, and the dictionary's networks
+# are small enough for their matrices to fit in memory. Games in networks that were too big to cover are handed
+# to a breadth-first search.
+#
+# If the words of the graph change (see word_graph.update_words), the matrices are worked out again before the
+# next game. They aren't saved to the oracle file, which is left as it was.
+
+oracle = None
+oracle_max_network_size = 8192
+
+# Builds or loads the distance matrices. Runs after the graph is built (and its networks found).
+def prepare(oracle_file=None, max_network_size=8192):
+    global oracle, oracle_max_network_size
+    oracle = distance_oracle.create_oracle(oracle_file, max_network_size)
+    oracle_max_network_size = max_network_size
+
+def do_word_ladder(src, dest, max_dist=20):
+    if len(src) != len(dest) and not wg.Node.graph.cross_length: return None
+    src_node = wg.Node.find_node(src)
+    if src_node is None: return None
+    dest_node = wg.Node.find_node(dest)
+    if dest_node is None or dest_node is src_node: return None
+    global oracle
+    graph = wg.Node.graph
+    if oracle is None: prepare()
+    if not oracle.is_current(graph):
+        oracle = distance_oracle.DistanceOracle.build(graph, oracle_max_network_size)
+    distance = oracle.get_distance(graph, src_node.id, dest_node.id)
+    if distance is None or distance > max_dist: return None
+    if distance == distance_oracle.NOT_COVERED:
+        # The network is too big for a matrix, search instead
+        path = tree_cache.TreeCache.walk_to_root(tree_cache.TreeCache.build_tree(graph, dest_node.id), src_node.id)
+    else:
+        path = oracle.get_path(graph, src_node.id, dest_node.id)
+    if path is None or len(path) - 1 > max_dist: return None
+    return [graph.words[idx] for idx in path]
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Precomputed distance solution to word ladder problem, please read documentation.')
+    parser.add_argument("-v", "--verbose", help="If set, print extra info", action="store_true")
+    parser.add_argument("--test", help="Which test to run: 0=simple, 1=full, 2=difficult words, 3=impossible pairs", type=int, default=1)
+    parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of games)", type=int, default=-1)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    parser.add_argument("--oraclefile", help="A prebuilt distance file to load. If it doesn't exist, the distances are worked out and saved there",
+                        type=str, default="")
+    parser.add_argument("--max_network_size", help="Networks with more words than this get no distance matrix", type=int,
+                        default=8192)
+    args = parser.parse_args()
+
+    test.set_verbose(args.verbose)
+    wg.set_random_seed(None if args.seed == -1 else args.seed)
+
+    wg.create_nodes(args.wordfile,
+                    None if len(args.graphfile) == 0 else args.graphfile,
+                    cross_length=args.cross_length)
+    prepare(None if len(args.oraclefile) == 0 else args.oraclefile, args.max_network_size)
+    test.preliminary_test()
+    test.set_word_ladder_func(do_word_ladder)
+    test.run_test(args.test)
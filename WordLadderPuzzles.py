@@ -0,0 +1,55 @@
+import word_graph as wg
+import puzzle_generator
+import argparse
+import json
+import os
+import sys
+import time
+
+# BULK PUZZLES
+# -------------------------------------------------------
+#
+# Prints puzzles whose shortest ladder is exactly --distance steps, one JSON object per line (see
+# puzzle_generator.py). The distances are all worked out up front, so every puzzle printed is guaranteed to be
+# solvable in that many steps and none of them is solved on its own.
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Generates word ladder puzzles of an exact difficulty, as JSON lines.')
+    parser.add_argument("--distance", help="Number of steps in the shortest ladder of every puzzle", type=int, default=8)
+    parser.add_argument("--count", help="Number of puzzles to generate", type=int, default=1000)
+    parser.add_argument("--counts", help="Instead of generating puzzles, print how many pairs there are at each distance",
+                        action="store_true")
+    parser.add_argument("--max_sources", help="Searches per network; bigger networks have their pairs sampled", type=int,
+                        default=8192)
+    parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of puzzles)", type=int, default=-1)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    args = parser.parse_args()
+
+    wg.set_random_seed(None if args.seed == -1 else args.seed)
+    wg.create_nodes(args.wordfile,
+                    None if len(args.graphfile) == 0 else args.graphfile,
+                    cross_length=args.cross_length)
+    start_time = time.perf_counter()
+    index = puzzle_generator.create_index(args.max_sources)
+    print("Indexed pairs in {:.2f} seconds".format(time.perf_counter() - start_time), file=sys.stderr)
+
+    if args.counts:
+        for distance, count in index.get_distance_counts().items():
+            print(distance, count)
+        sys.exit(0)
+
+    try:
+        for src, dest in puzzle_generator.generate_puzzles(index, args.distance, args.count):
+            sys.stdout.write(json.dumps({'src': src, 'dest': dest, 'distance': args.distance}))
+            sys.stdout.write("\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Whatever was reading the puzzles (e.g. head) has had enough. Point stdout at nothing, so that Python
+        # doesn't complain when it flushes it on the way out.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
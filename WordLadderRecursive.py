@@ -1,59 +1,26 @@
 import word_graph as wg
 import test_framework as test
+import search_context
+import profiling
+import result_cache
 import argparse
 
-# Parse arguments
-parser = argparse.ArgumentParser(description='Recursive solution to word ladder problem, please read documentation.')
-parser.add_argument("-v", "--verbose", help="If set, print extra info", action="store_true")
-parser.add_argument("--test", help="Which test to run: 0=simple, 1=full, 2=difficult words", type=int, default=1)
-parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of games)", type=int, default=-1)
-parser.add_argument("--wordfile", help="A text file to parse into list of words", type=str, default="")
-args = parser.parse_args()
-
-test.set_verbose(args.verbose)
-wg.set_random_seed(None if args.seed == -1 else args.seed)
-
-# MEMOIZATION
+# SEARCH STATE
 # -------------------------------------------------------
+#
+# The words on the current path are marked as visited, so the search never goes round in circles, and the best
+# routes found so far are memoized (see below). Both live in a search context (see search_context.py) rather than
+# on the nodes, so any number of searches can run on the same graph at once. A word is visited if its entry in the
+# "visited" array holds the current generation number. The memoized routes are kept in the context's memo
+# dictionary, which starts out empty for every search.
 
-class MemNode(wg.Node):
-
-    memoized_nodes = []
-
-    def __init__(self, word):
-        super().__init__(word)
-        # All known memoization lists that have this node on their route
-        self.memoization_list = None
-        self.visited_flag = False
-
-    def set_memoize_list(self, the_list):
-        self.memoization_list = the_list
-
-    def get_memoize_list(self):
-        return self.memoization_list
-
-    # the_list contains a path from the first node in the list to the destination node, which is last
-    @staticmethod
-    def memoize_solution(the_list):
-        # Only bother if list is long enough to be useful
-        if the_list is None or len(the_list) <= 2:
-            return
-        first_node = the_list[0]
-        first_node.set_memoize_list(the_list[1:])
-        MemNode.memoized_nodes.append(first_node)
-
-    @staticmethod
-    def clear_memoization():
-        for n in MemNode.memoized_nodes:
-            n.set_memoize_list(None)
-        MemNode.memoized_nodes.clear()
-
-def node_factory(word):
-    return MemNode(word)
-
-wg.Node.set_factory_func(node_factory)
-wg.create_nodes(None if len(args.wordfile) == 0 else args.wordfile)
-test.preliminary_test()
+# the_list contains a path from the first node in the list to the destination node, which is last
+def memoize_solution(the_list, context):
+    # Only bother if list is long enough to be useful
+    if the_list is None or len(the_list) <= 2:
+        return
+    context.memo[the_list[0].id] = the_list[1:]
+    if context.counters is not None: context.counters['memoized'] += 1
 
 # RECURSIVE SOLUTION
 # -------------------------------------------------------
@@ -75,36 +42,49 @@ test.preliminary_test()
 #     path: list of nodes forming a path. The start node is always at the beginning
 #     dest: destination node
 #     remaining_steps: number of steps we are permitted to get from last node in path to dest node
+#     context: the search context. If not given, the calling thread's context is used, and a new search is begun.
 # Returns a list of remaining nodes to destination (excluding those already in path) if any can be found, otherwise None
-def get_steps(path, dest, remaining_steps):
+def get_steps(path, dest, remaining_steps, context=None):
+    if context is None:
+        context = search_context.get_context()
+        context.begin(wg.Node.graph)
+    visited = context.get_array("visited", 'I')
+    counters = context.counters
+    if counters is not None:
+        counters['calls'] += 1
+        if len(path) > counters['max_depth']:
+            counters['max_depth'] = len(path)
     if remaining_steps == 0:
         # We already have a better solution, don't go further
+        if counters is not None: counters['pruned_no_steps'] += 1
         return None
 
     current_node = path[-1]
     if current_node.get_word_distance(dest) > remaining_steps:
         # No point to continuing, we don't have enough steps left to get to the other word
+        if counters is not None: counters['pruned_too_far'] += 1
         return None
 
-    if current_node.memoization_list is not None:
+    memoization_list = context.memo.get(current_node.id)
+    if memoization_list is not None:
         # We already have a best solution from current_node to dest, so try to use it
-        if len(current_node.memoization_list) > remaining_steps:
+        if len(memoization_list) > remaining_steps:
             # The memoization list isn't useful; the best solution from here takes too many steps.
+            if counters is not None: counters['pruned_memo_too_long'] += 1
             return None
         else:
-            result = path + current_node.memoization_list
-            test.info("A fast solution: ", wg.string_list(result))
-            return current_node.memoization_list
+            if counters is not None: counters['memo_hits'] += 1
+            return memoization_list
+    if counters is not None: counters['memo_misses'] += 1
 
-    current_node.visited_flag = True
+    visited[current_node.id] = context.generation
     matches = current_node.neighbors
     # First, search all neighbors for goal. If we find one, this saves us from any more recursion.
     for m in matches:
         if m is dest:
             # this is our goal!
-            result = path + [m]
-            test.info("A slow solution: ", wg.string_list(result))
-            current_node.visited_flag = False
+            if counters is not None: counters['goal_found'] += 1
+            visited[current_node.id] = 0
             return [m]
 
     # Goal node has not been found, attempt recursion into branches. We will choose the branch with the most
@@ -113,10 +93,10 @@ def get_steps(path, dest, remaining_steps):
     best_subpath_count = 1000000
     best_subpath = None
     for m in matches:
-        if not m.visited_flag:
+        if visited[m.id] != context.generation:
             # See if there's a way between m and dest
             path.append(m)
-            subpath = get_steps(path, dest, new_remaining_steps)
+            subpath = get_steps(path, dest, new_remaining_steps, context)
             if subpath is not None:
                 subpath = [m] + subpath
                 if len(subpath) < best_subpath_count:
@@ -126,26 +106,196 @@ def get_steps(path, dest, remaining_steps):
                     new_remaining_steps = best_subpath_count - 2
                     best_subpath = subpath
             path.pop(-1)
-    current_node.visited_flag = False
+    visited[current_node.id] = 0
     # Save the path from m to dest so we can use it later
-    MemNode.memoize_solution(best_subpath)
+    memoize_solution(best_subpath, context)
     return best_subpath
 
+# ITERATIVE DEEPENING (IDA*)
+# -------------------------------------------------------
+#
+# The recursive search above finds the best route out of each word before it gives up on it, so a loose max_dist
+# lets it wander far down long, useless branches. Iterative deepening A-Star turns that around: it runs a series of
+# depth-first searches, each one allowed to go no further than a bound, and only raises the bound when a search
+# fails. A branch is cut off as soon as the steps taken so far plus the number of letters still to change (which
+# never overestimates) exceed the bound. The first search starts with the bound at the number of letters that
+# differ between the two words, and each failed search raises it to the smallest amount by which a branch went
+# over. So the first ladder found is the shortest one.
+#
+# Unlike get_steps(), this doesn't recurse. The current path is kept on an explicit stack of word IDs, alongside
+# each word's neighbor list, the estimates for those neighbors, and how far through the list the search has got. When
+# the goal is reached, the ladder is simply the words on the stack, so no partial paths are ever copied.
+#
+# Depth-first search on its own visits the same words over and over, by different routes. A transposition table
+# remembers, for every word the current search has entered, the largest number of steps it had left to spend when
+# it got there (its remaining budget). If the search reaches that word again with no more steps to spend than
+# before, going on can't find anything the earlier visit didn't, so the branch is cut off. That includes words on
+# the current path, so the search never goes round in circles either. The table is a pair of arrays in the search
+# context, indexed by word ID, so its size is bounded by the size of the dictionary, and it is emptied for each
+# search by stamping entries with the search's own number (generation and bound together) rather than clearing it.
+def solve_ida_star(src, dest, max_dist, context=None):
+    if context is None:
+        context = search_context.get_context()
+    generation = context.begin(wg.Node.graph)
+    table_stamps = context.get_array("ida_stamp", 'Q')
+    table_budgets = context.get_array("ida_budget")
+    get_neighbor_ids = wg.Node.graph.get_neighbor_ids
+    words = wg.Node.graph.words
+    dest_id = dest.id
+    dest_word = dest.word
+    node_list = wg.Node.node_list
+    # Counters (see search_context.set_collect_counters), kept locally and handed over at the end
+    iteration_count = 0
+    expanded_count = 0
+    max_depth = 0
+    pruned_bound_count = 0  # neighbors where steps so far + letters to change went over the bound
+    pruned_table_count = 0  # neighbors already entered by this search with at least as many steps to spare
+
+    # Almost every neighbor of a word the search enters gets an estimate, so they're worked out all at once, as the
+    # word is entered
+    if wg.Node.graph.cross_length:
+        # Words can differ in length, so letters can't just be compared (see WordGraph.find_length_neighbors())
+        def _estimate_all(ids):
+            return [wg.get_edit_distance(words[idx], dest_word) for idx in ids]
+    else:
+        # The number of letters that differ, from the packed words (see PACKED WORDS in word_graph.py)
+        codes = wg.Node.graph.get_word_codes()
+        dest_code = codes[dest_id]
+        def _estimate_all(ids):
+            return wg.get_code_distances(codes, ids, dest_code)
+
+    result = None
+    bound = _estimate_all([src.id])[0]
+    while bound <= max_dist:
+        iteration_count = iteration_count + 1
+        # Different for every search of every generation (a bound can't be longer than the dictionary)
+        stamp = (generation << 32) + bound
+        next_bound = max_dist + 1
+        stack_ids = [src.id]
+        stack_neighbors = [get_neighbor_ids(src.id)]
+        stack_estimates = [_estimate_all(stack_neighbors[0])]
+        stack_positions = [0]
+        table_stamps[src.id] = stamp
+        table_budgets[src.id] = bound
+        while len(stack_ids) > 0:
+            position = stack_positions[-1]
+            neighbor_ids = stack_neighbors[-1]
+            if position == len(neighbor_ids):
+                # Every neighbor has been tried, back up a step
+                stack_ids.pop()
+                stack_neighbors.pop()
+                stack_estimates.pop()
+                stack_positions.pop()
+                continue
+            stack_positions[-1] = position + 1
+            neighbor_id = neighbor_ids[position]
+            cost = len(stack_ids)
+            if neighbor_id == dest_id:
+                # The bound was raised one failed search at a time, so there's no shorter ladder than this
+                stack_ids.append(neighbor_id)
+                result = [node_list[idx] for idx in stack_ids]
+                break
+            total = cost + stack_estimates[-1][position]
+            if total > bound:
+                if total < next_bound:
+                    next_bound = total
+                pruned_bound_count = pruned_bound_count + 1
+                continue
+            budget = bound - cost
+            if table_stamps[neighbor_id] == stamp and table_budgets[neighbor_id] >= budget:
+                pruned_table_count = pruned_table_count + 1
+                continue
+            table_stamps[neighbor_id] = stamp
+            table_budgets[neighbor_id] = budget
+            stack_ids.append(neighbor_id)
+            neighbor_ids = get_neighbor_ids(neighbor_id)
+            stack_neighbors.append(neighbor_ids)
+            stack_estimates.append(_estimate_all(neighbor_ids))
+            stack_positions.append(0)
+            expanded_count = expanded_count + 1
+            if cost > max_depth:
+                max_depth = cost
+        if result is not None:
+            break
+        bound = next_bound
+
+    if context.counters is not None:
+        context.counters.update({'iterations': iteration_count, 'expanded': expanded_count, 'max_depth': max_depth,
+                                 'pruned_bound': pruned_bound_count, 'pruned_table': pruned_table_count,
+                                 'final_bound': bound if result is not None else None})
+    return result
+
+engine = "recursive"  # Which search to use: "recursive" (get_steps) or "ida" (solve_ida_star)
+
+def set_engine(new_engine):
+    global engine
+    engine = new_engine
+
 def do_word_ladder(src, dest, max_dist=20):
-    if len(src) != len(dest): return None
+    if len(src) != len(dest) and not wg.Node.graph.cross_length: return None
     src_node = wg.Node.find_node(src)
     if src_node is None: return None
     path = [src_node]
     dest_node = wg.Node.find_node(dest)
     if dest_node is None or dest_node is src_node: return None
     if src_node.network_number != dest_node.network_number: return None
-    MemNode.clear_memoization()
-    result = get_steps(path, dest_node, max_dist)
-    if result is None: return None
-    result = [src_node] + result
+    if engine == "ida":
+        result = solve_ida_star(src_node, dest_node, max_dist)
+        if result is None: return None
+    else:
+        result = get_steps(path, dest_node, max_dist)
+        if result is None: return None
+        result = [src_node] + result
     str_list = wg.string_list(result)
     return str_list
 
-test.set_word_ladder_func(do_word_ladder)
-test.run_test(args.test)
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Recursive solution to word ladder problem, please read documentation.')
+    parser.add_argument("-v", "--verbose", help="If set, print extra info", action="store_true")
+    parser.add_argument("--test", help="Which test to run: 0=simple, 1=full, 2=difficult words, 3=impossible pairs", type=int, default=1)
+    parser.add_argument("--seed", help="A seed for random number generation (to reproduce same set of games)", type=int, default=-1)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    parser.add_argument("--lazy", help="If set, work out each word's neighbors the first time they're needed, instead of building the whole graph",
+                        action="store_true")
+    parser.add_argument("--neighbor_cache", help="With --lazy, the number of words whose neighbors are kept (default: {})".format(wg.DEFAULT_NEIGHBOR_CACHE_SIZE),
+                        type=int, default=None)
+    parser.add_argument("--shard_dir", help="Split the graph into shards by word length, kept in this directory. Shards are built there if needed, and each is loaded when first used",
+                        type=str, default="")
+    parser.add_argument("--shard_workers", help="Number of processes building shards at once (default: one per core)", type=int,
+                        default=None)
+    parser.add_argument("--result_cache", help="An SQLite file of answers to games already played, shared by all runs and processes",
+                        type=str, default="")
+    parser.add_argument("--result_cache_mb", help="Size limit of the result cache, in megabytes", type=int, default=256)
+    parser.add_argument("--engine", help="Search: recursive (depth-first with memoization, default) or ida (iterative deepening A-Star)",
+                        type=str, default="recursive", choices=["recursive", "ida"])
+    parser.add_argument("--counters", help="If set, count what the search does and print it after each game",
+                        action="store_true")
+    parser.add_argument("--profile", help="Run each game under a profiler and print its report", type=str,
+                        choices=profiling.PROFILERS)
+    args = parser.parse_args()
+
+    test.set_verbose(args.verbose)
+    test.set_counters(args.counters)
+    test.set_profiler(args.profile)
+    wg.set_random_seed(None if args.seed == -1 else args.seed)
 
+    set_engine(args.engine)
+    wg.create_nodes(args.wordfile,
+                    None if len(args.graphfile) == 0 else args.graphfile,
+                    cross_length=args.cross_length, lazy=args.lazy,
+                    neighbor_cache_size=args.neighbor_cache,
+                    shard_dir=None if len(args.shard_dir) == 0 else args.shard_dir,
+                    shard_workers=args.shard_workers)
+    test.preliminary_test()
+    if len(args.result_cache) > 0:
+        cache = result_cache.ResultCache(args.result_cache, args.result_cache_mb * 1024 * 1024)
+        test.set_word_ladder_func(result_cache.cached_solver(cache, args.engine, do_word_ladder))
+    else:
+        test.set_word_ladder_func(do_word_ladder)
+    test.run_test(args.test)
@@ -0,0 +1,215 @@
+import word_graph as wg
+import solvers
+import WordLadderBatch as batch
+import argparse
+import asyncio
+import bisect
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import time
+import urllib.parse
+
+# QUERY SERVER
+# -------------------------------------------------------
+#
+# The other scripts build the graph, play some games and exit, so every run pays for building the graph again.
+# This one builds it once and then answers games over HTTP for as long as it runs:
+#
+#   GET /ladder?src=HEAD&dest=TAIL&max_dist=20   -> {"src": ..., "dest": ..., "max_dist": ..., "ladder": [...]}
+#   GET /neighbors?word=HEAD                     -> {"word": "HEAD", "neighbors": [...]}
+#   GET /stats                                   -> request counts and a histogram of response times
+#
+# The server runs on a single asyncio event loop. Solving a game can take a while, so games are handed to a pool of
+# worker processes (set up the same way as for batch queries, see WordLadderBatch.py) and the loop carries on
+# with other requests in the meantime. Looking up neighbors is a single hash lookup, so it's answered right away.
+#
+# A game that takes longer than --timeout seconds is stopped by the worker itself (see WordLadderBatch.solve_query),
+# so the worker is free for the next game straight away, and the request gets a 504 response. Where the worker
+# can't stop a game (timer signals are Unix only), the request still fails after TIMEOUT_GRACE seconds more, but
+# the worker finishes the game before it takes another.
+#
+# A request with bad parameters gets a 400 response, and one whose game made the solver fail gets a 500.
+
+# Response times are counted in buckets, each holding the times up to its bound (in milliseconds)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+class LatencyHistogram(object):
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # the last bucket holds everything slower
+        self.total = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total = self.total + 1
+        self.total_ms = self.total_ms + ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def get_stats(self):
+        labels = ["<={}".format(bound) for bound in LATENCY_BUCKETS_MS] + [">{}".format(LATENCY_BUCKETS_MS[-1])]
+        return {'count': self.total,
+                'mean_ms': self.total_ms / self.total if self.total > 0 else 0.0,
+                'max_ms': self.max_ms,
+                'buckets_ms': dict(zip(labels, self.counts))}
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error", 504: "Gateway Timeout"}
+
+# Seconds to wait for a worker beyond the time limit of the game, for the answer or the timeout to come back
+TIMEOUT_GRACE = 1.0
+
+class QueryServer(object):
+
+    def __init__(self, pool, max_dist=20, timeout=5.0):
+        self.pool = pool
+        self.max_dist = max_dist
+        self.timeout = timeout
+        self.latency = {}  # path -> LatencyHistogram
+        self.timeouts = 0
+        self.errors = 0
+
+    # Works out the response to one request. Returns (status, object to send as JSON).
+    async def handle_request(self, method, target):
+        if method != "GET":
+            return 405, {'error': "Only GET is supported"}
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if url.path == "/ladder":
+            if "src" not in params or "dest" not in params:
+                return 400, {'error': "Expected src and dest"}
+            try:
+                max_dist = int(params.get("max_dist", self.max_dist))
+            except ValueError:
+                return 400, {'error': "max_dist must be a whole number"}
+            query = (params["src"].upper(), params["dest"].upper(), max_dist)
+            future = asyncio.get_running_loop().run_in_executor(self.pool, batch.solve_query, query, self.timeout)
+            try:
+                result = await asyncio.wait_for(future, self.timeout + TIMEOUT_GRACE)
+            except (asyncio.TimeoutError, batch.QueryTimeout):
+                self.timeouts = self.timeouts + 1
+                return 504, {'error': "Timed out after {} seconds".format(self.timeout)}
+            except Exception as e:
+                self.errors = self.errors + 1
+                return 500, {'error': "Solver failed: {}".format(e)}
+            return 200, json.loads(result)
+        if url.path == "/neighbors":
+            if "word" not in params:
+                return 400, {'error': "Expected word"}
+            word = params["word"].upper()
+            return 200, {'word': word, 'neighbors': wg.find_matches(word)}
+        if url.path == "/stats":
+            return 200, {'timeouts': self.timeouts, 'errors': self.errors,
+                         'latency': {path: histogram.get_stats() for path, histogram in self.latency.items()}}
+        return 404, {'error': "Unknown path {}".format(url.path)}
+
+    # Serves one connection, which may send any number of requests (HTTP/1.1 keep-alive)
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if len(request_line) == 0:
+                    break
+                start_time = time.perf_counter()
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    status, body = 400, {'error': "Malformed request line"}
+                    keep_alive = False
+                else:
+                    method, target, version = parts
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    try:
+                        status, body = await self.handle_request(method, target)
+                    except ValueError as e:
+                        # A request that can't be made sense of (such as a malformed URL)
+                        self.errors = self.errors + 1
+                        status, body = 400, {'error': str(e)}
+                    except Exception as e:
+                        self.errors = self.errors + 1
+                        status, body = 500, {'error': str(e)}
+
+                payload = json.dumps(body).encode("utf-8")
+                writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n{}\r\n".format(
+                    status, HTTP_REASONS.get(status, ""), len(payload),
+                    "" if keep_alive else "Connection: close\r\n").encode("latin-1"))
+                writer.write(payload)
+                await writer.drain()
+                path = urllib.parse.urlsplit(parts[1]).path if len(parts) == 3 else "?"
+                self.latency.setdefault(path, LatencyHistogram()).add((time.perf_counter() - start_time) * 1000)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    print("Listening on {}".format(", ".join(str(sock.getsockname()) for sock in listener.sockets)), file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+if __name__ == "__main__":
+    # Parse arguments
+    parser = argparse.ArgumentParser(description='Answers word ladder games over HTTP, with the graph kept in memory.')
+    parser.add_argument("--solver", help="Which solution to use", type=str, default="astar",
+                        choices=solvers.get_solver_names())
+    parser.add_argument("--host", help="Address to listen on", type=str, default="127.0.0.1")
+    parser.add_argument("--port", help="Port to listen on", type=int, default=8080)
+    parser.add_argument("--workers", help="Number of worker processes that solve games", type=int,
+                        default=os.cpu_count())
+    parser.add_argument("--timeout", help="Seconds a game may take before the request fails", type=float, default=5.0)
+    parser.add_argument("--max_dist", help="Maximum ladder length, for requests that don't give one", type=int, default=20)
+    parser.add_argument("--tree_cache", help="Answer from a cache of up to this many search trees (0 = use the solver)",
+                        type=int, default=0)
+    parser.add_argument("--tree_cache_mb", help="Memory limit of the tree cache, in megabytes", type=int, default=256)
+    parser.add_argument("--wordfile", help="A text file to parse into list of words (may be gzipped, can be given more than once)",
+                        type=str, action="append")
+    parser.add_argument("--graphfile", help="A prebuilt graph file to load. If it doesn't exist, the graph is built and saved there",
+                        type=str, default="")
+    parser.add_argument("--cross_length", help="If set, adding or removing a letter is also a step (ignored if the graphfile exists)",
+                        action="store_true")
+    parser.add_argument("--lazy", help="If set, work out each word's neighbors the first time they're needed, instead of building the whole graph",
+                        action="store_true")
+    parser.add_argument("--neighbor_cache", help="With --lazy, the number of words whose neighbors are kept (default: {})".format(wg.DEFAULT_NEIGHBOR_CACHE_SIZE),
+                        type=int, default=None)
+    parser.add_argument("--shard_dir", help="Split the graph into shards by word length, kept in this directory. Shards are built there if needed, and each is loaded when first used",
+                        type=str, default="")
+    parser.add_argument("--shard_workers", help="Number of processes building shards at once (default: one per core)", type=int,
+                        default=None)
+    parser.add_argument("--result_cache", help="An SQLite file of answers to games already played, shared by all runs and processes",
+                        type=str, default="")
+    parser.add_argument("--result_cache_mb", help="Size limit of the result cache, in megabytes", type=int, default=256)
+    args = parser.parse_args()
+
+    graph_file = None if len(args.graphfile) == 0 else args.graphfile
+    load_args = (args.solver, args.wordfile, graph_file, args.tree_cache, args.tree_cache_mb, args.cross_length,
+                 args.lazy, args.neighbor_cache, None if len(args.shard_dir) == 0 else args.shard_dir, args.shard_workers,
+                 None if len(args.result_cache) == 0 else args.result_cache, args.result_cache_mb)
+
+    # The graph is needed here too, to answer /neighbors
+    batch.load(*load_args)
+    workers = max(args.workers, 1)
+    if "fork" in multiprocessing.get_all_start_methods():
+        pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(workers, initializer=batch.load, initargs=load_args)
+
+    with pool:
+        # Start the workers now, before the event loop and its threads exist
+        pool.submit(int).result()
+        try:
+            asyncio.run(serve(QueryServer(pool, args.max_dist, args.timeout), args.host, args.port))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,56 @@
+import word_graph as wg
+import argparse
+import itertools
+import string
+import timeit
+
+# WORD LOOKUP BENCHMARK
+# -------------------------------------------------------
+#
+# Every game looks up both of its words (and is_path_possible looks them up again), so word lookup is on the hot
+# path. Node.find_node used to scan the list of words matching the first wildcard pattern of the word ("*ALT" for
+# "SALT"), which gets slower the more words share that pattern. It now uses the graph's word -> ID dictionary.
+#
+# This benchmark builds dictionaries where every "*XYZ" pattern is shared by a growing number of words, and
+# times lookups through find_node against the old bucket scan (reproduced here for comparison).
+
+# Builds a dictionary where each "*XYZ" wildcard pattern matches bucket_size words
+def make_word_list(bucket_size, suffix_count):
+    suffixes = ["".join(letters) for letters in itertools.islice(itertools.product(string.ascii_uppercase, repeat=3),
+                                                                  suffix_count)]
+    return [first + suffix for suffix in suffixes for first in string.ascii_uppercase[:bucket_size]]
+
+# The way find_node used to work, with a dictionary of wildcard patterns built for the purpose
+def make_bucket_scan(words):
+    buckets = {}
+    for word in words:
+        buckets.setdefault("*" + word[1:], []).append(word)
+    def bucket_scan(word):
+        for candidate in buckets.get("*" + word[1:], []):
+            if candidate == word:
+                return candidate
+        return None
+    return bucket_scan
+
+def run_benchmark(lookups, suffix_count):
+    print("{:>12} {:>10} {:>18} {:>18}".format("bucket size", "words", "find_node (ns)", "bucket scan (ns)"))
+    for bucket_size in (1, 2, 4, 8, 16, 26):
+        words = make_word_list(bucket_size, suffix_count)
+        wg.Node.populate_nodes_from_word_list(words)
+        # Look up the last word of each bucket, the worst case for the scan
+        targets = words[bucket_size - 1::bucket_size]
+        bucket_scan = make_bucket_scan(words)
+        for word in targets:
+            assert wg.Node.find_node(word).word == word
+        def _lookup(find_func):
+            total = timeit.timeit(lambda: [find_func(word) for word in targets], number=max(1, lookups // len(targets)))
+            return total * 1e9 / (max(1, lookups // len(targets)) * len(targets))
+        print("{:>12} {:>10} {:>18.1f} {:>18.1f}".format(bucket_size, len(words), _lookup(wg.Node.find_node),
+                                                         _lookup(bucket_scan)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Times word lookups as more words share a wildcard pattern.')
+    parser.add_argument("--lookups", help="Number of lookups to time per dictionary", type=int, default=200000)
+    parser.add_argument("--suffixes", help="Number of distinct wildcard patterns in each dictionary", type=int, default=500)
+    args = parser.parse_args()
+    run_benchmark(args.lookups, args.suffixes)
@@ -0,0 +1,245 @@
+import word_graph as wg
+import test_framework as test
+import solvers
+import WordLadderBidirectional
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import string
+import sys
+import time
+try:
+    import resource
+except ImportError:
+    resource = None  # not on Windows, so there are no memory figures there
+
+# BENCHMARK SUITE
+# -------------------------------------------------------
+#
+# The test framework prints the average and longest time over a few dozen games, which says little about how the
+# solvers really behave. This benchmark runs a fixed, seeded set of games against every solver and reports:
+#
+#   - how long the graph takes to build, and the peak memory (resident set size) of the process after building
+#     it and at the end (Unix only; elsewhere the memory figures are null)
+#   - how long each solver's preparation takes (e.g. the distance oracle's matrices)
+#   - for each workload, the number of games solved and the 50th, 95th and 99th percentile time per game
+#
+# Workloads:
+#   random     pairs of words joined by a random wander (get_word_by_random_wander), so a ladder always exists
+#   difficult  the difficult words of test 2 (default dictionary only)
+#   cross      pairs of words in different networks, which should be rejected quickly
+#
+# Dictionaries are the default word lists ("default") or synthetic dictionaries of five-letter words of a given
+# size (e.g. "100000"). Random words hardly ever differ by one letter, so a dictionary of them is nearly all
+# isolated words. Instead, most synthetic words are made by changing one letter of a word already in the
+# dictionary, which links them together the way real words are, and the rest are random words that start new
+# networks. Each dictionary is benchmarked in a fresh process, so the memory figures of one don't leak into the
+# next.
+#
+# Results are written as JSON. Two result files can be compared with --compare OLD NEW, which prints the change
+# in each figure, so regressions between versions are easy to spot.
+
+WORKLOADS = ["random", "difficult", "cross"]
+PERCENTILES = [50, 95, 99]
+
+# Share of synthetic words that are random, rather than made from a word already in the dictionary
+SYNTHETIC_NEW_WORD_SHARE = 0.05
+
+# Returns count distinct words of the given length, always the same ones for the same seed
+def make_synthetic_words(count, seed, length=5):
+    rng = random.Random(seed)
+    words = set()
+    made = []  # the words in the order they were made, to pick from
+    while len(words) < count:
+        if len(made) == 0 or rng.random() < SYNTHETIC_NEW_WORD_SHARE:
+            word = "".join(rng.choice(string.ascii_uppercase) for i in range(length))
+        else:
+            word = rng.choice(made)
+            pos = rng.randrange(length)
+            word = word[:pos] + rng.choice(string.ascii_uppercase) + word[pos + 1:]
+        if word not in words:
+            words.add(word)
+            made.append(word)
+    return sorted(words)
+
+# Returns the peak memory of this process so far in kilobytes, or None where that can't be found out
+def get_peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # In bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+# Returns the p-th percentile of a sorted list, interpolating between the nearest values
+def get_percentile(sorted_values, p):
+    if len(sorted_values) == 0:
+        return 0.0
+    pos = (len(sorted_values) - 1) * p / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+# Returns the number of steps in the shortest ladder between two words, or default if there isn't one
+def get_shortest_distance(word1, word2, default):
+    node1 = wg.Node.find_node(word1)
+    node2 = wg.Node.find_node(word2)
+    if node1 is None or node2 is None or node1.network_number != node2.network_number:
+        return default
+    ladder = WordLadderBidirectional.solve_bidirectional(node1, node2, len(wg.Node.graph))
+    return default if ladder is None else len(ladder) - 1
+
+# Returns a list of (src, dest, max_dist) games for a workload. Games that have a solution get the length of the
+# shortest one as their max_dist, so that every solver gets the same, tight, limit. (The depth-first search of
+# the recursive solver can take minutes on the difficult words with a looser one.)
+def make_games(workload, query_count, dictionary, max_dist):
+    games = []
+    if workload == "random":
+        while len(games) < query_count:
+            word1 = wg.get_random_word()
+            word2, wander = wg.get_word_by_random_wander(word1, max_dist)
+            if word1 != word2:
+                games.append((word1, word2, get_shortest_distance(word1, word2, max_dist)))
+    elif workload == "difficult":
+        if dictionary == "default":
+            games = [(word1, word2, get_shortest_distance(word1, word2, 20)) for word1, word2 in test.DIFFICULT_WORD_PAIRS]
+    elif workload == "cross":
+        if wg.Node.graph.get_network_count() > 1:
+            for i in range(query_count * 100):
+                if len(games) == query_count:
+                    break
+                word1 = wg.get_random_word()
+                word2 = wg.get_random_word(length=len(word1))
+                node1 = wg.Node.find_node(word1)
+                node2 = wg.Node.find_node(word2)
+                if node1.network_number != node2.network_number:
+                    games.append((word1, word2, max_dist))
+    return games
+
+def time_games(solver, games):
+    times = []
+    solved = 0
+    for src, dest, max_dist in games:
+        start_time = time.perf_counter()
+        result = solver.do_word_ladder(src, dest, max_dist=max_dist)
+        times.append(time.perf_counter() - start_time)
+        if result is not None:
+            solved = solved + 1
+    times.sort()
+    stats = {'games': len(games), 'solved': solved,
+             'mean_ms': 1000 * sum(times) / len(times) if len(times) > 0 else 0.0,
+             'max_ms': 1000 * times[-1] if len(times) > 0 else 0.0}
+    for p in PERCENTILES:
+        stats['p{}_ms'.format(p)] = 1000 * get_percentile(times, p)
+    return stats
+
+# Benchmarks every solver on one dictionary. Runs in its own process (see run_suite).
+def run_dictionary(dictionary, solver_names, workloads, query_count, seed, max_dist):
+    if dictionary == "default":
+        words = None
+    else:
+        words = make_synthetic_words(int(dictionary), seed)
+
+    start_time = time.perf_counter()
+    if words is None:
+        wg.process_text_files()
+        # The word list comes out of a set, in an order that changes from run to run
+        words = sorted(wg.word_list)
+    wg.word_list = words
+    wg.Node.populate_nodes_from_word_list(wg.word_list)
+    wg.Node.find_isolated_nodes()
+    build_seconds = time.perf_counter() - start_time
+    graph = wg.Node.graph
+
+    results = {'dictionary': dictionary, 'words': len(graph), 'edges': len(graph.neighbor_ids) // 2,
+               'networks': graph.get_network_count(), 'build_seconds': build_seconds,
+               'build_peak_rss_kb': get_peak_rss_kb(), 'solvers': {}}
+    for name in solver_names:
+        solver = solvers.load_solver(name)
+        # Nodes are made by the solver's factory function, so make them again (the graph itself is kept)
+        wg.Node.populate_nodes_from_graph(graph)
+        start_time = time.perf_counter()
+        solvers.prepare_solver(solver)
+        solver_results = {'prepare_seconds': time.perf_counter() - start_time, 'workloads': {}}
+        for workload in workloads:
+            # Every solver gets exactly the same games
+            wg.set_random_seed(seed)
+            games = make_games(workload, query_count, dictionary, max_dist)
+            if len(games) > 0:
+                solver_results['workloads'][workload] = time_games(solver, games)
+        results['solvers'][name] = solver_results
+    # Including whatever the solvers built for themselves
+    results['peak_rss_kb'] = get_peak_rss_kb()
+    return results
+
+def run_suite(dictionaries, solver_names, workloads, query_count, seed, max_dist):
+    suite = {'python': platform.python_version(), 'platform': platform.platform(), 'seed': seed,
+             'queries': query_count, 'max_dist': max_dist, 'dictionaries': []}
+    # A fresh process for every dictionary (spawned rather than forked, so it starts with nothing in memory)
+    context = multiprocessing.get_context("spawn")
+    for dictionary in dictionaries:
+        print("Benchmarking dictionary {}...".format(dictionary), file=sys.stderr)
+        with context.Pool(1) as pool:
+            suite['dictionaries'].append(pool.apply(run_dictionary, (dictionary, solver_names, workloads, query_count,
+                                                                     seed, max_dist)))
+    return suite
+
+# Lists (name, value) for every figure in a result file, e.g. ("default/astar/random/p95_ms", 1.23). Figures that
+# weren't measured (null) are left out.
+def flatten_results(suite):
+    figures = []
+    for results in suite['dictionaries']:
+        prefix = results['dictionary']
+        figures.append((prefix + "/build_seconds", results['build_seconds']))
+        figures.append((prefix + "/build_peak_rss_kb", results['build_peak_rss_kb']))
+        figures.append((prefix + "/peak_rss_kb", results['peak_rss_kb']))
+        for name, solver_results in results['solvers'].items():
+            figures.append(("{}/{}/prepare_seconds".format(prefix, name), solver_results['prepare_seconds']))
+            for workload, stats in solver_results['workloads'].items():
+                for key in ['solved', 'mean_ms'] + ['p{}_ms'.format(p) for p in PERCENTILES]:
+                    figures.append(("{}/{}/{}/{}".format(prefix, name, workload, key), stats[key]))
+    return [(name, value) for name, value in figures if value is not None]
+
+def compare_results(old_file, new_file):
+    with open(old_file) as f:
+        old_figures = dict(flatten_results(json.load(f)))
+    with open(new_file) as f:
+        new_figures = flatten_results(json.load(f))
+    print("{:<50} {:>14} {:>14} {:>9}".format("figure", "old", "new", "change"))
+    for name, new_value in new_figures:
+        old_value = old_figures.get(name)
+        if old_value is None:
+            print("{:<50} {:>14} {:>14.4f} {:>9}".format(name, "-", new_value, "new"))
+            continue
+        change = "{:+.1f}%".format(100 * (new_value - old_value) / old_value) if old_value != 0 else "-"
+        print("{:<50} {:>14.4f} {:>14.4f} {:>9}".format(name, old_value, new_value, change))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks graph building and every solver on a fixed set of games.')
+    parser.add_argument("--dictionaries", help="'default' and/or sizes of synthetic dictionaries, e.g. 10000 100000 1000000",
+                        type=str, nargs="+", default=["default", "10000", "100000"])
+    parser.add_argument("--solvers", help="Which solvers to benchmark (default: all)", type=str, nargs="+",
+                        choices=solvers.get_solver_names(), default=solvers.get_solver_names())
+    parser.add_argument("--workloads", help="Which workloads to run (default: all)", type=str, nargs="+",
+                        choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--queries", help="Number of games per workload", type=int, default=200)
+    parser.add_argument("--seed", help="Seed for the synthetic dictionaries and the games", type=int, default=1)
+    parser.add_argument("--max_dist", help="Length of the random wanders, and max_dist of cross-network games",
+                        type=int, default=8)
+    parser.add_argument("--output", help="File to write the results to, as JSON ('-' for stdout)", type=str, default="-")
+    parser.add_argument("--compare", help="Instead of benchmarking, compare two result files", type=str, nargs=2,
+                        metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare_results(*args.compare)
+        sys.exit(0)
+
+    suite = run_suite(args.dictionaries, args.solvers, args.workloads, args.queries, args.seed, args.max_dist)
+    if args.output == "-":
+        json.dump(suite, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as out_file:
+            json.dump(suite, out_file, indent=2)
@@ -0,0 +1,225 @@
+import word_graph as wg
+import hashlib
+import mmap
+import os.path
+import struct
+import sys
+from array import array
+
+# ALL-PAIRS DISTANCE ORACLE
+# -------------------------------------------------------
+#
+# For dictionaries of three and four-letter words, every network is small enough that we can afford to store the
+# distance between every pair of its words: one byte per pair, in an n x n matrix per network (about 29 MB for a
+# network of 5,000+ words). Once that's done, the length of the shortest ladder between any two words is a single
+# lookup. The ladder itself is found by greedy descent: from the start word, step to any neighbor that is one
+# step closer to the goal, and repeat. That takes one step per rung and never searches.
+#
+# The matrices are computed with a bit-parallel breadth-first search. Instead of running one search per word,
+# all of them run at once. Every word keeps a bit set (a Python integer) of the searches that have reached it.
+# Each round, a word collects the bits that its neighbors picked up in the previous round. Any bits that are new
+# to it mean those searches have just reached it, at a distance equal to the round number. Python does the bit
+# operations on whole integers in C, so this is much faster than searching from every word in turn.
+#
+# Networks larger than max_network_size are skipped (the matrices grow with the square of the size). Distance
+# queries in them return NOT_COVERED, and the caller should fall back to a search.
+#
+# The matrices are only good for the graph they were worked out for, as it was then. Adding or removing words (see
+# word_graph.update_words) changes the networks, so an oracle asked about a different graph, or one whose version
+# has changed, raises ValueError instead of giving wrong answers. It has to be built again. For the same reason, an
+# oracle file records the fingerprint of the dictionary (see word_graph.py) and a hash of the words in ID order,
+# and is only loaded for a graph with the same words, numbered the same way.
+
+ORACLE_FILE_MAGIC = b"WLORACL2"
+# magic, little endian flag, word count, neighbor count, network count, fingerprint of the dictionary, hash of the
+# words in ID order (all to check it matches the graph)
+ORACLE_FILE_HEADER = struct.Struct("<8s?3xIII16s16s")
+NOT_COVERED = -1
+
+# The oracle covers every network of the graph at once. A graph split into shards would have to load all of them
+# for that, which is what shards are there to avoid, so it's turned down.
+def check_whole_graph(graph):
+    if isinstance(graph, wg.ShardedWordGraph):
+        raise ValueError("The distance oracle needs the whole graph, it can't be used with a graph split by word length")
+
+# Returns a hash of the graph's words in ID order. Graphs built from the same words in a different order number
+# them differently, and the matrices are laid out by word ID.
+def get_word_order_hash(graph):
+    digest = hashlib.blake2b(digest_size=16)
+    for word in graph.words:
+        digest.update(word.encode("ascii"))
+        digest.update(b"\n")
+    return digest.digest()
+
+# Returns the neighbors of each of a network's members, as positions in members
+def get_local_neighbors(graph, members):
+    local_ids = {idx: i for i, idx in enumerate(members)}
+    return [[local_ids[adj] for adj in graph.get_neighbor_ids(idx)] for idx in members]
+
+# Runs many breadth-first searches at once over a network (see above). neighbors is as returned by
+# get_local_neighbors(), and sources[v] holds the bits of the searches that start at the v-th member. Generates
+# (distance, new_bits) for each round, where new_bits[v] holds the bits of the searches that have just reached
+# the v-th member, at that distance. The list is only good until the next round.
+def bit_parallel_bfs(neighbors, sources):
+    count = len(neighbors)
+    reached = list(sources)  # bit s of reached[v] is set once search s has reached v
+    frontier = list(sources)  # the bits each word picked up in the last round
+    distance = 0
+    while any(frontier):
+        distance = distance + 1
+        next_frontier = [0] * count
+        for v in range(count):
+            new_bits = 0
+            for u in neighbors[v]:
+                new_bits |= frontier[u]
+            new_bits &= ~reached[v]
+            if new_bits:
+                reached[v] |= new_bits
+                next_frontier[v] = new_bits
+        frontier = next_frontier
+        if any(frontier):
+            yield distance, frontier
+
+class DistanceOracle(object):
+
+    def __init__(self):
+        self.local_ids = array('i')  # word ID -> row/column of the word in its network's matrix
+        self.matrix_offsets = array('q')  # network number -> start of its matrix, or NOT_COVERED
+        self.matrices = bytearray()  # all the matrices, back to back
+        self.mapping = None  # The memory-mapped oracle file, if loaded from one
+        self.graph = None  # the graph the matrices were worked out for
+        self.graph_version = None
+
+    # Computes the distance matrix for one network. Returns it as bytes: row v, column s is the distance between
+    # the v-th and s-th members.
+    @staticmethod
+    def compute_network_matrix(graph, members):
+        count = len(members)
+        rows = [0] * count  # each row is built as one big integer, with one byte per column
+        for distance, new_bits in bit_parallel_bfs(get_local_neighbors(graph, members),
+                                                   [1 << i for i in range(count)]):
+            if distance > 255:
+                raise ValueError("Distances in this network don't fit in a byte")
+            # Turns the '0' and '1' characters of a bit string into bytes of 0 and distance
+            to_distance = bytes.maketrans(b"01", bytes((0, distance)))
+            for v in range(count):
+                if new_bits[v]:
+                    # bin() lists the highest bit first, so read the bytes back as big-endian: byte s is then bit s
+                    rows[v] |= int.from_bytes(bin(new_bits[v])[2:].encode("ascii").translate(to_distance), "big")
+        return b"".join(row.to_bytes(count, "little") for row in rows)
+
+    # Returns whether the oracle was worked out for graph as it is now
+    def is_current(self, graph):
+        return graph is self.graph and graph.version == self.graph_version
+
+    def check_graph(self, graph):
+        if not self.is_current(graph):
+            raise ValueError("The distance oracle was worked out for a different graph, or before the graph last changed")
+
+    @staticmethod
+    def build(graph, max_network_size=8192):
+        check_whole_graph(graph)
+        oracle = DistanceOracle()
+        oracle.graph = graph
+        oracle.graph_version = graph.version
+        oracle.local_ids = array('i', [0]) * len(graph)
+        oracle.matrix_offsets = array('q', [NOT_COVERED]) * graph.get_network_count()
+        for network_number in range(graph.get_network_count()):
+            members = graph.get_network_members(network_number)
+            for i, idx in enumerate(members):
+                oracle.local_ids[idx] = i
+            if len(members) < 2 or len(members) > max_network_size:
+                continue
+            oracle.matrix_offsets[network_number] = len(oracle.matrices)
+            oracle.matrices.extend(DistanceOracle.compute_network_matrix(graph, members))
+        return oracle
+
+    # Returns the number of steps between word IDs a and b, or None if there is no route between them. If their
+    # network was too big to be covered, returns NOT_COVERED.
+    def get_distance(self, graph, a, b):
+        self.check_graph(graph)
+        network_number = graph.network_numbers[a]
+        if network_number != graph.network_numbers[b]:
+            return None
+        if a == b:
+            return 0
+        start = self.matrix_offsets[network_number]
+        if start == NOT_COVERED:
+            return NOT_COVERED
+        return self.matrices[start + self.local_ids[a] * graph.get_network_size(network_number) + self.local_ids[b]]
+
+    # Returns a shortest route from word ID a to word ID b as a list of word IDs, or None (see get_distance). Also
+    # None if the matrix and the graph disagree, so that no step closer to b can be found.
+    def get_path(self, graph, a, b):
+        distance = self.get_distance(graph, a, b)
+        if distance is None or distance == NOT_COVERED:
+            return None
+        network_number = graph.network_numbers[a]
+        start = self.matrix_offsets[network_number]
+        size = graph.get_network_size(network_number)
+        column = start + self.local_ids[b]
+        path = [a]
+        while distance > 0:
+            distance = distance - 1
+            for adj in graph.get_neighbor_ids(path[-1]):
+                if self.matrices[column + self.local_ids[adj] * size] == distance:
+                    path.append(adj)
+                    break
+            else:
+                return None
+        assert path[-1] == b
+        return path
+
+    # Writes the oracle to a binary file that can be loaded with DistanceOracle.load()
+    def save(self, file_name, graph):
+        with open(file_name, "wb") as oracle_file:
+            oracle_file.write(ORACLE_FILE_HEADER.pack(ORACLE_FILE_MAGIC, sys.byteorder == "little", len(graph),
+                                                      len(graph.neighbor_ids), len(self.matrix_offsets),
+                                                      bytes.fromhex(graph.get_fingerprint()),
+                                                      get_word_order_hash(graph)))
+            oracle_file.write(self.matrix_offsets)
+            oracle_file.write(self.local_ids)
+            oracle_file.write(self.matrices)
+
+    # Opens a file written by save(), memory-mapped like the graph file. graph must be the graph it was built for.
+    @staticmethod
+    def load(file_name, graph):
+        check_whole_graph(graph)
+        with open(file_name, "rb") as oracle_file:
+            mapping = mmap.mmap(oracle_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, little_endian, word_count, neighbor_count, network_count, fingerprint, order_hash = \
+            ORACLE_FILE_HEADER.unpack_from(mapping)
+        if magic != ORACLE_FILE_MAGIC:
+            raise ValueError("{} is not a distance oracle file".format(file_name))
+        if little_endian != (sys.byteorder == "little"):
+            raise ValueError("{} was written on a machine with a different byte order".format(file_name))
+        if word_count != len(graph) or neighbor_count != len(graph.neighbor_ids) or \
+                network_count != graph.get_network_count() or fingerprint != bytes.fromhex(graph.get_fingerprint()):
+            raise ValueError("{} was built for a different dictionary".format(file_name))
+        if order_hash != get_word_order_hash(graph):
+            raise ValueError("{} was built for a graph that numbers its words differently (load the graph from a "
+                             "graph file to keep the numbering)".format(file_name))
+
+        oracle = DistanceOracle()
+        oracle.mapping = mapping
+        oracle.graph = graph
+        oracle.graph_version = graph.version
+        view = memoryview(mapping)
+        pos = ORACLE_FILE_HEADER.size
+        oracle.matrix_offsets = view[pos:(pos + 8 * network_count)].cast('q')
+        pos = pos + 8 * network_count
+        oracle.local_ids = view[pos:(pos + 4 * word_count)].cast('i')
+        pos = pos + 4 * word_count
+        oracle.matrices = view[pos:]
+        return oracle
+
+# Builds (or loads, if oracle_file exists) the oracle for the graph in wg.Node.graph. A newly built oracle is
+# saved to oracle_file, if given.
+def create_oracle(oracle_file=None, max_network_size=8192):
+    graph = wg.Node.graph
+    if oracle_file is not None and os.path.exists(oracle_file):
+        return DistanceOracle.load(oracle_file, graph)
+    oracle = DistanceOracle.build(graph, max_network_size)
+    if oracle_file is not None:
+        oracle.save(oracle_file, graph)
+    return oracle
@@ -0,0 +1,288 @@
+import word_graph as wg
+import heapq
+import itertools
+
+# ENUMERATING LADDERS
+# -------------------------------------------------------
+#
+# The solvers return one ladder per game. Puzzle generation wants more: every shortest ladder between two words, or
+# the k best distinct ladders. Running a solver again and again won't give those, so this module finds them
+# directly.
+#
+# All shortest ladders
+#
+# One bidirectional breadth-first sweep (as in WordLadderBidirectional.py) finds the length D of the shortest
+# ladder, and the distance from each end of every word it saw. A word lies on a shortest ladder exactly when it is
+# k steps from the start and D - k steps from the goal. Those words, arranged in levels 0..D, with an edge from
+# every word to each of its neighbors on the next level, form the shortest-path DAG (directed acyclic graph).
+# Every route from the start to the goal through the DAG is a shortest ladder, and every shortest ladder is such a
+# route.
+#
+# The DAG is never bigger than the words and edges the sweep looked at, but the number of routes through it can
+# grow exponentially with D. So the ladders are never gathered into a list: ShortestLadderDag.ladders() is a
+# generator, walking the DAG depth-first with a stack of D entries and handing out one ladder at a time.
+# count_ladders() counts them without walking them, level by level.
+#
+# The k shortest ladders
+#
+# The first ladders are the shortest ones, straight from the DAG. If there are fewer than k of them, the rest come
+# from Yen's algorithm. Each ladder found so far is taken apart at every word (the "spur" word): the part up to
+# that word is kept, and a breadth-first search looks for the shortest way on from there that doesn't use any word
+# already in that part, nor any step out of the spur word that an earlier ladder with the same first part took.
+# Each of those makes a candidate ladder, and the shortest candidate is the next ladder. Ladders never repeat a
+# word. Only the k ladders handed out and their candidates are kept, so memory grows with k, not with the number
+# of ladders there are.
+
+class ShortestLadderDag(object):
+
+    def __init__(self, src, dest, distance, successors):
+        self.src = src  # word ID
+        self.dest = dest  # word ID
+        self.distance = distance  # steps in each shortest ladder
+        self.successors = successors  # word ID -> IDs of its neighbors on the next level
+
+    # Runs the bidirectional sweep from word ID src to word ID dest and builds the DAG. Returns None if there is no
+    # ladder of max_dist steps or fewer.
+    @staticmethod
+    def build(graph, src, dest, max_dist):
+        if src == dest:
+            return ShortestLadderDag(src, dest, 0, {})
+        src_depths = {src: 0}
+        dest_depths = {dest: 0}
+        src_frontier = [src]
+        dest_frontier = [dest]
+        src_depth = 0
+        dest_depth = 0
+        distance = None
+        get_neighbor_ids = graph.get_neighbor_ids
+        while len(src_frontier) > 0 and len(dest_frontier) > 0 and src_depth + dest_depth < max_dist:
+            # Grow the side with the smaller frontier by a whole layer
+            if len(src_frontier) <= len(dest_frontier):
+                frontier, depths, other_depths = src_frontier, src_depths, dest_depths
+                src_depth = src_depth + 1
+                depth = src_depth
+            else:
+                frontier, depths, other_depths = dest_frontier, dest_depths, src_depths
+                dest_depth = dest_depth + 1
+                depth = dest_depth
+            next_frontier = []
+            for idx in frontier:
+                for adj in get_neighbor_ids(idx):
+                    if adj in depths:
+                        continue
+                    depths[adj] = depth
+                    next_frontier.append(adj)
+                    other_depth = other_depths.get(adj)
+                    if other_depth is not None and (distance is None or depth + other_depth < distance):
+                        distance = depth + other_depth
+            if frontier is src_frontier:
+                src_frontier = next_frontier
+            else:
+                dest_frontier = next_frontier
+            if distance is not None:
+                break
+        if distance is None or distance > max_dist:
+            return None
+
+        # The middle level: words the source side reached at its last layer (or the goal itself), and the goal side
+        # reached at the matching depth. Both sides know the exact distance of every word on it.
+        middle = min(src_depth, distance)
+        levels = [None] * (distance + 1)
+        levels[middle] = [idx for idx, depth in src_depths.items()
+                          if depth == middle and dest_depths.get(idx) == distance - middle]
+        successors = {}
+        # Work back towards the start: a word on level k - 1 is one step from a word on level k, and k - 1 steps
+        # from the start
+        for level in range(middle, 0, -1):
+            previous = {}
+            for idx in levels[level]:
+                for adj in get_neighbor_ids(idx):
+                    if src_depths.get(adj) == level - 1:
+                        previous.setdefault(adj, []).append(idx)
+            successors.update(previous)
+            levels[level - 1] = list(previous)
+        # And forward towards the goal
+        for level in range(middle, distance):
+            following = {}
+            for idx in levels[level]:
+                steps = []
+                for adj in get_neighbor_ids(idx):
+                    if dest_depths.get(adj) == distance - level - 1:
+                        steps.append(adj)
+                        following[adj] = True
+                successors[idx] = steps
+            levels[level + 1] = list(following)
+        return ShortestLadderDag(src, dest, distance, successors)
+
+    # Returns the number of shortest ladders, however many there are, without listing them
+    def count_ladders(self):
+        counts = {self.src: 1}  # word ID -> number of routes to it from src
+        level = [self.src]
+        for step in range(self.distance):
+            next_counts = {}
+            for idx in level:
+                for adj in self.successors[idx]:
+                    next_counts[adj] = next_counts.get(adj, 0) + counts[idx]
+            counts = next_counts
+            level = list(next_counts)
+        return counts.get(self.dest, 0)
+
+    # Generates every shortest ladder as a list of word IDs. Each list is a new one, and nothing else is kept
+    # between ladders but the stack.
+    def ladders(self):
+        if self.distance == 0:
+            yield [self.src]
+            return
+        path = [self.src]
+        positions = [0]  # for each word on path, how many of its successors have been tried
+        while len(path) > 0:
+            steps = self.successors.get(path[-1], ())
+            position = positions[-1]
+            if len(path) == self.distance + 1 or position == len(steps):
+                if len(path) == self.distance + 1:
+                    yield list(path)
+                path.pop()
+                positions.pop()
+                continue
+            positions[-1] = position + 1
+            path.append(steps[position])
+            positions.append(0)
+
+# Returns the word IDs of the shortest ladder from word ID src to word ID dest that uses none of the words in
+# banned_words, and doesn't start with any of the steps in banned_steps, or None if there is none of max_dist steps
+# or fewer. Searches from both ends at once, like ShortestLadderDag.build().
+def find_spur_path(graph, src, dest, banned_words, banned_steps, max_dist):
+    src_parents = {src: -1}
+    dest_parents = {dest: -1}
+    src_depths = {src: 0}
+    dest_depths = {dest: 0}
+    src_frontier = [src]
+    dest_frontier = [dest]
+    src_depth = 0
+    dest_depth = 0
+    meeting = -1
+    get_neighbor_ids = graph.get_neighbor_ids
+    while len(src_frontier) > 0 and len(dest_frontier) > 0 and src_depth + dest_depth < max_dist:
+        if len(src_frontier) <= len(dest_frontier):
+            frontier, parents, depths, other_depths = src_frontier, src_parents, src_depths, dest_depths
+            src_depth = src_depth + 1
+            depth = src_depth
+        else:
+            frontier, parents, depths, other_depths = dest_frontier, dest_parents, dest_depths, src_depths
+            dest_depth = dest_depth + 1
+            depth = dest_depth
+        next_frontier = []
+        for idx in frontier:
+            for adj in get_neighbor_ids(idx):
+                if adj in parents or adj in banned_words:
+                    continue
+                # A banned step can't be taken in either direction
+                if (idx == src and adj in banned_steps) or (adj == src and idx in banned_steps):
+                    continue
+                parents[adj] = idx
+                depths[adj] = depth
+                next_frontier.append(adj)
+                if adj in other_depths and (meeting == -1 or depth + other_depths[adj] <
+                                            src_depths[meeting] + dest_depths[meeting]):
+                    meeting = adj
+        if frontier is src_frontier:
+            src_frontier = next_frontier
+        else:
+            dest_frontier = next_frontier
+        if meeting != -1:
+            break
+    if meeting == -1 or src_depths[meeting] + dest_depths[meeting] > max_dist:
+        return None
+
+    # Walk back to src, then forward to dest
+    path = []
+    idx = meeting
+    while idx != -1:
+        path.append(idx)
+        idx = src_parents[idx]
+    path.reverse()
+    idx = dest_parents[meeting]
+    while idx != -1:
+        path.append(idx)
+        idx = dest_parents[idx]
+    return path
+
+# Generates the ladders from word ID src to word ID dest of max_dist steps or fewer, shortest first, as lists of
+# word IDs. All the shortest ladders come first (see ShortestLadderDag), then Yen's algorithm takes over. Stops
+# after k ladders, or when there are no more.
+def generate_k_shortest(graph, src, dest, k, max_dist):
+    dag = ShortestLadderDag.build(graph, src, dest, max_dist)
+    if dag is None or k <= 0:
+        return
+    found = []  # the ladders handed out so far, which Yen's algorithm needs to know about
+    found_set = set()
+    for ladder in itertools.islice(dag.ladders(), k):
+        found.append(ladder)
+        found_set.add(tuple(ladder))
+        yield ladder
+    if len(found) == k or dag.distance == 0:
+        return
+
+    candidates = []  # heap of (steps, ladder as a tuple)
+    candidate_set = set()
+    # Spurs are taken from every ladder in the order it was found, as if Yen's algorithm had found them one by one
+    spur_source = 0
+    while len(found) < k:
+        while spur_source < len(found):
+            ladder = found[spur_source]
+            spur_source = spur_source + 1
+            for i in range(len(ladder) - 1):
+                root = ladder[:i + 1]
+                banned_steps = set(other[i + 1] for other in found
+                                   if len(other) > i + 1 and other[:i + 1] == root)
+                spur = find_spur_path(graph, ladder[i], dest, set(root[:-1]), banned_steps, max_dist - i)
+                if spur is None:
+                    continue
+                candidate = tuple(root[:-1] + spur)
+                if candidate not in found_set and candidate not in candidate_set:
+                    candidate_set.add(candidate)
+                    heapq.heappush(candidates, (len(candidate), candidate))
+        if len(candidates) == 0:
+            return
+        steps, candidate = heapq.heappop(candidates)
+        candidate_set.discard(candidate)
+        ladder = list(candidate)
+        found.append(ladder)
+        found_set.add(candidate)
+        yield ladder
+
+# The word-level versions. Each generates ladders as lists of words; nothing is generated if either word isn't in
+# the dictionary, the words are in different networks, or there's no ladder short enough.
+def get_word_ids(src, dest):
+    if len(src) != len(dest) and not wg.Node.graph.cross_length: return None
+    src_node = wg.Node.find_node(src)
+    dest_node = wg.Node.find_node(dest)
+    if src_node is None or dest_node is None: return None
+    if src_node.network_number != dest_node.network_number: return None
+    return src_node.id, dest_node.id
+
+def all_shortest_ladders(src, dest, max_dist=20):
+    ids = get_word_ids(src, dest)
+    if ids is None:
+        return
+    graph = wg.Node.graph
+    dag = ShortestLadderDag.build(graph, ids[0], ids[1], max_dist)
+    if dag is None:
+        return
+    for ladder in dag.ladders():
+        yield [graph.words[idx] for idx in ladder]
+
+def count_shortest_ladders(src, dest, max_dist=20):
+    ids = get_word_ids(src, dest)
+    if ids is None:
+        return 0
+    dag = ShortestLadderDag.build(wg.Node.graph, ids[0], ids[1], max_dist)
+    return 0 if dag is None else dag.count_ladders()
+
+def k_shortest_ladders(src, dest, k, max_dist=20):
+    ids = get_word_ids(src, dest)
+    if ids is None:
+        return
+    graph = wg.Node.graph
+    for ladder in generate_k_shortest(graph, ids[0], ids[1], k, max_dist):
+        yield [graph.words[idx] for idx in ladder]
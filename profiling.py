@@ -0,0 +1,78 @@
+import cProfile
+import collections
+import io
+import pstats
+import signal
+import sys
+import threading
+
+# PROFILING HOOKS
+# -------------------------------------------------------
+#
+# Runs a single call under a profiler and returns a short text report along with the call's result. Two kinds:
+#
+#   cprofile  Python's deterministic profiler. Every function call is timed, so the report is exact, but the call
+#             runs several times slower than normal.
+#   sample    A sampling profiler. A timer interrupts the call every SAMPLE_INTERVAL seconds of CPU time and notes
+#             which function was running (and where it was called from). It barely slows the call down, but short
+#             calls get few samples. Needs Unix signals, and only works in the main thread.
+
+PROFILERS = ["cprofile", "sample"]
+REPORT_LINES = 15
+SAMPLE_INTERVAL = 0.001
+
+def profile_call(kind, func, *args, **kwargs):
+    if kind == "cprofile":
+        return cprofile_call(func, *args, **kwargs)
+    if kind == "sample":
+        return sample_call(func, *args, **kwargs)
+    raise ValueError("Unknown profiler: {}".format(kind))
+
+def cprofile_call(func, *args, **kwargs):
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(REPORT_LINES)
+    return result, report.getvalue()
+
+# Names a frame's function as "file:line(function)", like cProfile does
+def describe_frame(frame):
+    code = frame.f_code
+    return "{}:{}({})".format(code.co_filename.rsplit("/", 1)[-1], code.co_firstlineno, code.co_name)
+
+def sample_call(func, *args, **kwargs):
+    if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        raise RuntimeError("The sampling profiler needs Unix signals and the main thread")
+    own_samples = collections.Counter()  # function -> samples where it was the one running
+    total_samples = collections.Counter()  # function -> samples where it was running or waiting on a call
+    sample_count = 0
+    # Frames from here up belong to the caller, not to the call being profiled
+    outer_frame = sys._getframe()
+
+    def _take_sample(signal_number, frame):
+        nonlocal sample_count
+        sample_count = sample_count + 1
+        own_samples[describe_frame(frame)] += 1
+        seen = set()
+        while frame is not None and frame is not outer_frame:
+            name = describe_frame(frame)
+            if name not in seen:
+                # Recursive functions only count once per sample
+                seen.add(name)
+                total_samples[name] += 1
+            frame = frame.f_back
+
+    old_handler = signal.signal(signal.SIGPROF, _take_sample)
+    signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, old_handler)
+
+    lines = ["{} samples".format(sample_count),
+             "{:>8} {:>8}  function".format("own", "total")]
+    for name, count in total_samples.most_common(REPORT_LINES):
+        lines.append("{:>7.1f}% {:>7.1f}%  {}".format(100 * own_samples[name] / sample_count,
+                                                     100 * count / sample_count, name))
+    return result, "\n".join(lines) + "\n"
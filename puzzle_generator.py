@@ -0,0 +1,142 @@
+import word_graph as wg
+import distance_oracle
+import bisect
+import random
+from array import array
+
+# PUZZLE GENERATOR
+# -------------------------------------------------------
+#
+# A good puzzle is a pair of words whose shortest ladder has a given number of steps (its difficulty). Picking a
+# random pair and solving it to find out how hard it is takes a search per puzzle, and most pairs turn out too
+# easy or impossible. Instead, we work out the distance between lots of pairs at once, file every pair under its
+# distance, and then draw puzzles of the wanted difficulty straight out of the file. Every puzzle drawn is
+# guaranteed to be solvable in exactly that many steps, and drawing one costs no search at all.
+#
+# The distances come from the bit-parallel breadth-first search of the distance oracle (see distance_oracle.py),
+# run over each network in Node.networks with a search starting from every word. For networks bigger than
+# max_sources, searches start from a random sample of max_sources of its words, so the index stays a manageable
+# size on large dictionaries. Either way, every (source, target) pair indexed is equally likely to be drawn.
+#
+# The index keeps, for each distance, the words that some search reached at that distance, and for each of them a
+# bit set (a Python integer) of the searches that reached it there. That's one bit per pair, however many pairs
+# there are. Alongside, a running total of the pairs lets a random pair be found with a binary search.
+#
+# Like the distance oracle, the index is only good for the graph it was built for, as it was then, so drawing
+# puzzles for a graph whose words have changed since raises ValueError.
+
+class PuzzleIndex(object):
+
+    def __init__(self):
+        self.sources = []  # network -> array of the IDs of the words its searches started from
+        self.targets = {}  # distance -> list of (network, array of word IDs reached at that distance)
+        self.bits = {}  # distance -> list, in step with targets, of lists of bit sets of searches
+        self.totals = {}  # distance -> list, in step with targets, of arrays of running totals of pairs
+        self.graph = None  # the graph the index was built for
+        self.graph_version = None
+
+    # Builds the index for every network of graph. rng chooses the sources in networks bigger than max_sources.
+    @staticmethod
+    def build(graph, max_sources=8192, rng=random):
+        index = PuzzleIndex()
+        index.graph = graph
+        index.graph_version = graph.version
+        for network_number in range(graph.get_network_count()):
+            members = graph.get_network_members(network_number)
+            if len(members) < 2:
+                continue
+            if len(members) <= max_sources:
+                sources = members
+            else:
+                sources = rng.sample(list(members), max_sources)
+            local_ids = {idx: i for i, idx in enumerate(members)}
+            initial = [0] * len(members)
+            for i, idx in enumerate(sources):
+                initial[local_ids[idx]] = 1 << i
+            network = len(index.sources)
+            index.sources.append(array('i', sources))
+            for distance, new_bits in distance_oracle.bit_parallel_bfs(
+                    distance_oracle.get_local_neighbors(graph, members), initial):
+                targets = array('i')
+                bits = []
+                totals = array('q')
+                total = 0
+                for v, reached in enumerate(new_bits):
+                    if reached:
+                        targets.append(members[v])
+                        bits.append(reached)
+                        total = total + count_bits(reached)
+                        totals.append(total)
+                index.targets.setdefault(distance, []).append((network, targets))
+                index.bits.setdefault(distance, []).append(bits)
+                index.totals.setdefault(distance, []).append(totals)
+        return index
+
+    def check_graph(self, graph):
+        if graph is not self.graph or graph.version != self.graph_version:
+            raise ValueError("The puzzle index was built for a different graph, or before the graph last changed")
+
+    # Returns the number of pairs indexed at each distance, as a dictionary
+    def get_distance_counts(self):
+        return {distance: sum(totals[-1] for totals in self.totals[distance]) for distance in sorted(self.totals)}
+
+    # Generates count random (source ID, target ID) pairs that are exactly distance steps apart. Pairs are drawn
+    # independently, so the same one can come up more than once. Generates nothing if there are no such pairs.
+    def sample(self, distance, count, rng=random):
+        if distance not in self.totals:
+            return
+        totals = self.totals[distance]
+        # Running totals across networks, to choose a network in proportion to its pairs
+        network_totals = []
+        total = 0
+        for network_pairs in totals:
+            total = total + network_pairs[-1]
+            network_totals.append(total)
+        for i in range(count):
+            pair = rng.randrange(total)
+            k = bisect.bisect_right(network_totals, pair)
+            if k > 0:
+                pair = pair - network_totals[k - 1]
+            # Then the target word, and then which of the searches that reached it
+            v = bisect.bisect_right(totals[k], pair)
+            if v > 0:
+                pair = pair - totals[k][v - 1]
+            network, targets = self.targets[distance][k]
+            source = self.sources[network][find_set_bit(self.bits[distance][k][v], pair)]
+            yield source, targets[v]
+
+def count_bits(bits):
+    return bin(bits).count("1")
+
+# Returns the position of the n-th (counting from 0) set bit of bits. Halves the integer until it's small, keeping
+# whichever half holds the bit, so the work is done on whole integers in C.
+def find_set_bit(bits, n):
+    position = 0
+    while bits.bit_length() > 64:
+        half = bits.bit_length() // 2
+        low = bits & ((1 << half) - 1)
+        low_count = count_bits(low)
+        if n < low_count:
+            bits = low
+        else:
+            n = n - low_count
+            bits = bits >> half
+            position = position + half
+    while True:
+        if bits & 1:
+            if n == 0:
+                return position
+            n = n - 1
+        bits = bits >> 1
+        position = position + 1
+
+# Builds the index for the graph in wg.Node.graph, with sources chosen using the word graph's random generator
+def create_index(max_sources=8192):
+    return PuzzleIndex.build(wg.Node.graph, max_sources)
+
+# Generates count puzzles of the given difficulty from index, as (start word, goal word) pairs
+def generate_puzzles(index, distance, count):
+    index.check_graph(wg.Node.graph)
+    words = wg.Node.graph.words
+    for source, target in index.sample(distance, count):
+        yield words[source], words[target]
@@ -0,0 +1,152 @@
+import word_graph as wg
+import os
+import sqlite3
+import threading
+import time
+
+# RESULT CACHE
+# -------------------------------------------------------
+#
+# The same games come up again and again, across runs and across processes. A ResultCache keeps the answer to
+# every game it's given in an SQLite database on disk, so a game that has been played before is answered with a
+# single lookup, and the solver isn't run at all. Any number of processes can share one cache file: the database
+# is in WAL (write-ahead log) mode, so readers never wait for a writer, and writers take turns.
+#
+# An answer is stored under the fingerprint of the dictionary (see FINGERPRINTS in word_graph.py), the solver that
+# worked it out, and the game (start word, goal word and max_dist). When the dictionary changes, so does its
+# fingerprint, so answers worked out on the old dictionary are never handed out again. They're left for eviction
+# to clear away. Games without a ladder (words that aren't in the dictionary, words in different networks, or no
+# ladder short enough) are stored too, as NULL. They're often the slowest games to work out.
+#
+# The database is kept to about max_bytes. Every EVICTION_INTERVAL answers stored, its size is checked, and if
+# it's too big, the least recently used answers are deleted, as many as it takes to bring it down to
+# EVICTION_TARGET of max_bytes (going by the average size of an answer). SQLite reuses the space they took, so the
+# file stops growing. Reading an answer marks it as used, but only if it hasn't been marked in the last
+# TOUCH_INTERVAL seconds, so that repeated games don't all turn into writes.
+
+EVICTION_INTERVAL = 1000
+EVICTION_TARGET = 0.9
+TOUCH_INTERVAL = 60.0
+
+# A ladder is stored as its words separated by spaces
+CREATE_TABLE = """CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT NOT NULL,
+    solver TEXT NOT NULL,
+    src TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    max_dist INTEGER NOT NULL,
+    ladder TEXT,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (fingerprint, solver, src, dest, max_dist)
+) WITHOUT ROWID"""
+CREATE_INDEX = "CREATE INDEX IF NOT EXISTS results_by_last_used ON results (last_used)"
+KEY_COLUMNS = "fingerprint = ? AND solver = ? AND src = ? AND dest = ? AND max_dist = ?"
+
+class ResultCache(object):
+
+    def __init__(self, file_name, max_bytes=256 * 1024 * 1024):
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        # An SQLite connection can't be shared between threads, or carried over into a forked process, so every
+        # thread of every process opens its own, the first time it needs one
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        # Set up the database now, so that a bad file name is reported straight away
+        connection = self.open_connection()
+        connection.close()
+
+    def open_connection(self):
+        # Autocommit mode: every statement is a transaction of its own
+        connection = sqlite3.connect(self.file_name, timeout=30.0, isolation_level=None, check_same_thread=False)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode, this still can't corrupt the database, but a power cut may lose the latest answers
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(CREATE_TABLE)
+            connection.execute(CREATE_INDEX)
+        except sqlite3.DatabaseError:
+            connection.close()
+            raise ValueError("{} is not a result cache file".format(self.file_name))
+        return connection
+
+    def get_connection(self):
+        if getattr(self.local, "pid", None) != os.getpid():
+            self.local.connection = self.open_connection()
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    # Looks up a game. Returns (True, ladder) if it's in the cache, where ladder is a list of words or None if the
+    # game has no ladder, or (False, None) if it isn't.
+    def get(self, fingerprint, solver, src, dest, max_dist):
+        connection = self.get_connection()
+        key = (fingerprint, solver, src, dest, max_dist)
+        row = connection.execute("SELECT ladder, last_used FROM results WHERE " + KEY_COLUMNS, key).fetchone()
+        if row is None:
+            self.misses = self.misses + 1
+            return False, None
+        self.hits = self.hits + 1
+        ladder, last_used = row
+        now = time.time()
+        if now - last_used > TOUCH_INTERVAL:
+            connection.execute("UPDATE results SET last_used = ? WHERE " + KEY_COLUMNS, (now,) + key)
+        return True, None if ladder is None else ladder.split(" ")
+
+    def put(self, fingerprint, solver, src, dest, max_dist, ladder):
+        connection = self.get_connection()
+        connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (fingerprint, solver, src, dest, max_dist, None if ladder is None else " ".join(ladder),
+                            time.time()))
+        self.stores = self.stores + 1
+        if self.stores % EVICTION_INTERVAL == 0:
+            self.evict()
+
+    # Returns the space taken by the answers in the database, not counting pages freed by eviction
+    def get_size_in_bytes(self):
+        connection = self.get_connection()
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        free_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - free_count) * page_size
+
+    # Deletes the least recently used answers if the database is too big. Returns the number deleted.
+    def evict(self):
+        size = self.get_size_in_bytes()
+        if size <= self.max_bytes:
+            return 0
+        connection = self.get_connection()
+        count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count == 0:
+            return 0
+        doomed = max(count - int(count * EVICTION_TARGET * self.max_bytes / size), 1)
+        # Answers used at the same moment as the last one to go, go with it
+        cursor = connection.execute("DELETE FROM results WHERE last_used <= "
+                                    "(SELECT last_used FROM results ORDER BY last_used LIMIT 1 OFFSET ?)",
+                                    (doomed - 1,))
+        self.evictions = self.evictions + cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        self.get_connection().execute("DELETE FROM results")
+
+    # The hits and misses are only those of this process
+    def get_stats(self):
+        entries = self.get_connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores, 'evictions': self.evictions,
+                'entries': entries, 'bytes': self.get_size_in_bytes()}
+
+# Returns a version of do_word_ladder (a solver's function that runs one game) that looks the game up in cache
+# first, and stores the answer if it has to be worked out. solver names the solver in the cache, as answers from
+# different solvers can differ. The dictionary is the one in wg.Node.graph when the game is played.
+def cached_solver(cache, solver, do_word_ladder):
+    def _do_word_ladder(src, dest, max_dist=20):
+        fingerprint = wg.Node.graph.get_fingerprint()
+        found, ladder = cache.get(fingerprint, solver, src, dest, max_dist)
+        if found:
+            return ladder
+        ladder = do_word_ladder(src, dest, max_dist=max_dist)
+        cache.put(fingerprint, solver, src, dest, max_dist, ladder)
+        return ladder
+    return _do_word_ladder
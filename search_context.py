@@ -0,0 +1,75 @@
+import collections
+import threading
+from array import array
+
+# SEARCH CONTEXTS
+# -------------------------------------------------------
+#
+# A search has to remember things about the words it visits: the cost of getting there, the word it came from,
+# whether it has been visited yet, and so on. If that's kept on the nodes themselves, only one search can run at a
+# time, and every search has to start by wiping what the last one left behind, which takes time in proportion to
+# the whole dictionary however short the ladder is.
+#
+# Instead, a search keeps its state in a SearchContext: flat arrays indexed by word ID. Alongside them, a stamp
+# array records which search last wrote each word's entries. Starting a search just moves on to the next
+# generation number, and an entry whose stamp doesn't match the current generation is treated as untouched,
+# whatever values are left in it. So starting a search costs nothing, however big the graph.
+#
+# A context can be reused for any number of searches, one after the other. get_context() hands each thread a
+# context of its own, so several threads can search the same graph at once. (Code that interleaves searches in a
+# single thread, e.g. in async tasks, should give each one its own SearchContext.)
+
+MAX_GENERATION = 0xFFFFFFFF
+
+# Solvers can count what they do (words expanded, searches pruned, ...) in the context's counters dictionary.
+# Counting is off by default, and then counters is None, so solvers only pay for a check.
+collect_counters = False
+
+def set_collect_counters(enabled):
+    global collect_counters
+    collect_counters = enabled
+
+class SearchContext(object):
+
+    def __init__(self):
+        self.generation = 0
+        self.stamps = array('I')  # word ID -> generation of the search that last wrote its entries
+        self.arrays = {}  # name -> array of per-word values
+        self.memo = {}  # anything else a search wants to keep, emptied by begin()
+        self.counters = None  # name -> count for the current search, if collect_counters is set
+
+    # Returns the named per-word array, creating it (filled with zeros) the first time. Values are only meaningful
+    # for words stamped with the current generation.
+    def get_array(self, name, typecode='i'):
+        values = self.arrays.get(name)
+        if values is None:
+            values = array(typecode, [0]) * len(self.stamps)
+            self.arrays[name] = values
+        return values
+
+    # Gets ready for a new search over graph, and returns its generation number. The arrays grow if the graph has
+    # grown since the last search (see WordGraph.add_word).
+    def begin(self, graph):
+        extra = len(graph) - len(self.stamps)
+        if extra > 0:
+            self.stamps.extend(array('I', [0]) * extra)
+            for values in self.arrays.values():
+                values.extend(array(values.typecode, [0]) * extra)
+        self.generation = self.generation + 1
+        if self.generation > MAX_GENERATION:
+            # Once in four billion searches, start counting again from scratch
+            self.stamps = array('I', [0]) * len(self.stamps)
+            self.generation = 1
+        self.memo = {}
+        self.counters = collections.Counter() if collect_counters else None
+        return self.generation
+
+thread_contexts = threading.local()
+
+# Returns the calling thread's context
+def get_context():
+    context = getattr(thread_contexts, "context", None)
+    if context is None:
+        context = SearchContext()
+        thread_contexts.context = context
+    return context
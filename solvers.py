@@ -0,0 +1,37 @@
+import importlib
+import word_graph as wg
+
+# Each solution lives in its own script. The tools that can run any of them (batch queries and so on) look them
+# up here by name.
+SOLVER_MODULES = {
+    "astar": "WordLadderAStar",
+    "recursive": "WordLadderRecursive",
+    "ida": "WordLadderRecursive",
+    "bidirectional": "WordLadderBidirectional",
+    "oracle": "WordLadderOracle",
+}
+
+# Solvers that share a module with another solver, and the engine the module has to be switched to for each
+SOLVER_ENGINES = {
+    "recursive": "recursive",
+    "ida": "ida",
+}
+
+def get_solver_names():
+    return list(SOLVER_MODULES.keys())
+
+# Imports a solver module and installs its Node subclass, if it has one. This must happen before the graph is
+# built, because the nodes are created by the factory function. The module's do_word_ladder() runs one game.
+def load_solver(name):
+    module = importlib.import_module(SOLVER_MODULES[name])
+    if name in SOLVER_ENGINES:
+        module.set_engine(SOLVER_ENGINES[name])
+    wg.Node.set_factory_func(getattr(module, "node_factory", None))
+    return module
+
+# Some solvers do work ahead of time, once the graph is built (e.g. the oracle's distance matrices). This runs it,
+# so that it happens once and not in every worker process.
+def prepare_solver(module):
+    prepare = getattr(module, "prepare", None)
+    if prepare is not None:
+        prepare()
@@ -1,4 +1,6 @@
 import word_graph as wg
+import search_context
+import profiling
 import time
 
 # This is a framework for running a series of word ladder games, some pre-determined, some random.
@@ -16,6 +18,17 @@ def info(*args, **kvargs):
     if verbose_mode:
         print(*args, **kvargs)
 
+# Turns on the solvers' counters (see search_context.py), which are printed after each game and kept in the
+# test results
+def set_counters(enabled):
+    search_context.set_collect_counters(enabled)
+
+profiler = None  # None, or the kind of profiler to run each game under (see profiling.py)
+
+def set_profiler(kind):
+    global profiler
+    profiler = kind
+
 word_ladder_func = None
 # List of dictionaries.
 test_results = []
@@ -24,17 +37,30 @@ test_results = []
 def ladder_func_wrapper(func_to_wrap):
     def wrapper(word1, word2, max_dist=20):
         print("Word ladder from {} to {}, max_dist={}".format(word1, word2, max_dist))
+        # Solvers that don't use a search context leave no counters behind
+        context = search_context.get_context()
+        context.counters = None
+        profile_report = None
         start_time = time.time()
-        result = func_to_wrap(word1, word2, max_dist=max_dist)
+        if profiler is None:
+            result = func_to_wrap(word1, word2, max_dist=max_dist)
+        else:
+            result, profile_report = profiling.profile_call(profiler, func_to_wrap, word1, word2, max_dist=max_dist)
         end_time = time.time()
         print("Steps are: ", result)
+        counters = None if context.counters is None else dict(context.counters)
+        if counters is not None:
+            print("Counters: ", counters)
+        if profile_report is not None:
+            print(profile_report)
         success = True
         if result is None:
             result = []
             success = False
         possible_path, valid_nodes = wg.is_path_possible(word1, word2)
         test_outcome_dict = {'words':result, 'src':word1, 'dest':word2, 'success':success, 'time':(end_time-start_time),
-                             'different_networks':(valid_nodes and not possible_path)}
+                             'different_networks':(valid_nodes and not possible_path), 'counters':counters,
+                             'profile':profile_report}
         test_results.append(test_outcome_dict)
         return result
     return wrapper
@@ -51,9 +77,16 @@ def preliminary_test():
     info("Matches for 'CART'")
     info(wg.find_matches("CART"))
 
-    for network in wg.Node.networks:
-        if len(network) < 50:
-            info("small network: ", wg.string_list(network))
+    if not verbose_mode:
+        # Working out the sizes would load every shard of a sharded graph, only to throw them away
+        return
+    graph = wg.Node.graph
+    sizes = [graph.get_network_size(n) for n in range(graph.get_network_count())]
+    info("{} networks, largest has {} words, {} words are isolated".format(len(sizes), max(sizes, default=0),
+                                                                          sizes.count(1)))
+    for network_number, size in enumerate(sizes):
+        if size < 50:
+            info("small network: ", [graph.words[idx] for idx in graph.get_network_members(network_number)])
 
 
 # A very bare-bones test
@@ -65,17 +98,57 @@ def simple_test():
     print("random word: ", wg.get_random_word())
     print("Random seed: ", wg.get_random_seed())
 
+# Pairs of words with long ladders between them (in the default dictionary)
+DIFFICULT_WORD_PAIRS = [
+    ("NOVA", "SPRY"),
+    ("FISC", "UMPY"),
+    ("LOGE", "UDON"),
+    ("MAZE", "UFOS"),
+    ("YUKY", "EGMA"),
+    ("WHIO", "EXUL"), # "EXUL" is unreachable
+    ("FRET", "YGOE"),
+]
+
 def difficult_words_test():
-    word_ladder_func("NOVA", "SPRY")
-    word_ladder_func("FISC", "UMPY")
-    word_ladder_func("LOGE", "UDON")
-    word_ladder_func("MAZE", "UFOS")
-    word_ladder_func("YUKY", "EGMA")
-    word_ladder_func("WHIO", "EXUL") # "EXUL" is unreachable
-    word_ladder_func("FRET", "YGOE")
+    for word1, word2 in DIFFICULT_WORD_PAIRS:
+        word_ladder_func(word1, word2)
 
     process_test_results()
 
+# Pairs of words with no ladder between them (in the default dictionary, without cross-length steps). They're in
+# different networks, so every solver should turn them down straight away, without searching.
+IMPOSSIBLE_WORD_PAIRS = [
+    ("MAST", "ONYX"),
+    ("WHIO", "EXUL"),
+    ("CAT", "IWI"),
+]
+
+# Seconds that turning down an impossible pair may take
+IMPOSSIBLE_PAIR_TIME = 0.1
+
+def impossible_pairs_test():
+    for word1, word2 in IMPOSSIBLE_WORD_PAIRS:
+        word_ladder_func(word1, word2)
+
+    problem_count = 0
+    print("")
+    print("IMPOSSIBLE PAIRS:")
+    for t_o in test_results[-len(IMPOSSIBLE_WORD_PAIRS):]:
+        if t_o['success']:
+            problem = "found a ladder: {}".format(t_o['words'])
+        elif not t_o['different_networks']:
+            problem = "the words are in the same network"
+        elif t_o['time'] > IMPOSSIBLE_PAIR_TIME:
+            problem = "took too long"
+        else:
+            problem = None
+        if problem is not None:
+            problem_count = problem_count + 1
+        print("{} to {}: time={} {}".format(t_o['src'], t_o['dest'], t_o['time'],
+                                            "OK" if problem is None else "PROBLEM, " + problem))
+    print("{} of {} impossible pairs turned down in time".format(len(IMPOSSIBLE_WORD_PAIRS) - problem_count,
+                                                               len(IMPOSSIBLE_WORD_PAIRS)))
+
 # A more elaborate test. Executes a series of games.
 def full_test():
     # basic tests
@@ -118,6 +191,8 @@ def run_test(test_type):
         full_test()
     elif test_type == 2:
         difficult_words_test()
+    elif test_type == 3:
+        impossible_pairs_test()
 
 def process_test_results():
 
@@ -0,0 +1,129 @@
+import word_graph as wg
+from array import array
+from collections import OrderedDict
+
+# SHORTEST-PATH TREE CACHE
+# -------------------------------------------------------
+#
+# A breadth-first search from a word finds the shortest route from that word to every other word in its network.
+# The routes can be stored very compactly: for every word, we only need to remember the word one step closer to
+# the start (its "parent"). Following parents from any word leads back to the start along a shortest route.
+#
+# When lots of games share a start or goal word, it pays to keep these parent arrays around. A game whose start
+# word has a cached tree is answered by walking parents from the goal word back to the start. Because moves can be
+# undone (if TOAD -> LOAD is a move, so is LOAD -> TOAD), a tree cached for the goal word works just as well: walk
+# parents from the start word towards the goal.
+#
+# Each tree takes four bytes per word in the dictionary. The cache holds a limited number of trees, and a
+# limited number of bytes, throwing out the least recently used tree when full.
+#
+# The trees are only good for the graph they were built on, as it was then. Adding or removing a word (see
+# WordGraph.add_word) can make shorter routes or break old ones, and a new word has no slot in the old trees, so
+# the cache empties itself as soon as it's asked about a different graph, or a graph whose version has changed.
+
+class TreeCache(object):
+
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()  # root word ID -> parent array, least recently used first
+        self.size_in_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.graph = None  # the graph the trees were built on
+        self.graph_version = None
+
+    # Runs a breadth-first search from word ID root. In the returned array, parents[i] is the ID one step closer
+    # to root, or -1 if i can't be reached. root is its own parent.
+    @staticmethod
+    def build_tree(graph, root):
+        parents = array('i', [-1]) * len(graph)
+        parents[root] = root
+        queue = array('i', [root])
+        pos = 0
+        while pos < len(queue):
+            idx = queue[pos]
+            pos = pos + 1
+            for adj in graph.get_neighbor_ids(idx):
+                if parents[adj] == -1:
+                    parents[adj] = idx
+                    queue.append(adj)
+        return parents
+
+    # Returns the cached tree rooted at word ID root, or None
+    def get_tree(self, root):
+        tree = self.trees.get(root)
+        if tree is not None:
+            self.trees.move_to_end(root)
+        return tree
+
+    def add_tree(self, root, tree):
+        size = tree.itemsize * len(tree)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        while len(self.trees) >= self.max_entries or self.size_in_bytes + size > self.max_bytes:
+            old_root, old_tree = self.trees.popitem(last=False)
+            self.size_in_bytes = self.size_in_bytes - old_tree.itemsize * len(old_tree)
+        self.trees[root] = tree
+        self.size_in_bytes = self.size_in_bytes + size
+
+    def clear(self):
+        self.trees.clear()
+        self.size_in_bytes = 0
+
+    # Empties the cache if its trees were built on a different graph, or before the graph last changed
+    def check_graph(self, graph):
+        if graph is not self.graph or graph.version != self.graph_version:
+            self.clear()
+            self.graph = graph
+            self.graph_version = graph.version
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.trees), 'bytes': self.size_in_bytes}
+
+    # Returns a list of word IDs making up a shortest route from src to dest, or None if there isn't one. On a
+    # miss, a tree is built for src and cached.
+    def find_path(self, graph, src, dest):
+        self.check_graph(graph)
+        tree = self.get_tree(src)
+        if tree is not None:
+            self.hits = self.hits + 1
+            path = TreeCache.walk_to_root(tree, dest)
+            if path is not None:
+                path.reverse()
+            return path
+        tree = self.get_tree(dest)
+        if tree is not None:
+            self.hits = self.hits + 1
+            return TreeCache.walk_to_root(tree, src)
+
+        self.misses = self.misses + 1
+        tree = TreeCache.build_tree(graph, src)
+        self.add_tree(src, tree)
+        path = TreeCache.walk_to_root(tree, dest)
+        if path is not None:
+            path.reverse()
+        return path
+
+    # Follows parents from word ID idx to the root of the tree
+    @staticmethod
+    def walk_to_root(tree, idx):
+        if tree[idx] == -1:
+            return None
+        path = [idx]
+        while tree[idx] != idx:
+            idx = tree[idx]
+            path.append(idx)
+        return path
+
+    # Same interface as the do_word_ladder() of the solvers, answering from the cache
+    def do_word_ladder(self, src, dest, max_dist=20):
+        if len(src) != len(dest) and not wg.Node.graph.cross_length: return None
+        src_node = wg.Node.find_node(src)
+        if src_node is None: return None
+        dest_node = wg.Node.find_node(dest)
+        if dest_node is None or dest_node is src_node: return None
+        if src_node.network_number != dest_node.network_number: return None
+        path = self.find_path(wg.Node.graph, src_node.id, dest_node.id)
+        if path is None or len(path) - 1 > max_dist: return None
+        return [wg.Node.graph.words[idx] for idx in path]
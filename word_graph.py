@@ -1,10 +1,26 @@
 import random
 import time
+import bisect
+import concurrent.futures
+import json
+import multiprocessing
+import threading
+import gzip
+import hashlib
 import re
+import string
+import collections
+import itertools
 import os.path
+import sys
+import mmap
+import struct
+from array import array
 
 # List of all the words in the dictionary
 word_list = []
+# word -> position in word_list, made by update_words() when first needed, and dropped when word_list is replaced
+word_positions = None
 the_random_seed = 0
 
 # Both the recursive and A-Star solutions to the word ladder problem rely on a connected graph. Each node
@@ -15,13 +31,1145 @@ the_random_seed = 0
 # The code in this file processes some text files to generate a list of three and four-letter words. The
 # words are then processed into Node objects, and the nodes are connected to one another.
 
-# This is a base class, meant to be subclassed by the different algorithms
+# The connections between words are stored in a compact form. Every word gets an integer ID (its position in
+# the words list). The neighbor IDs of all words are stored back to back in a single array, and a second array
+# records where each word's run of neighbors starts: the neighbors of word i are
+# neighbor_ids[offsets[i]:offsets[i + 1]]. This is known as "compressed sparse row" (CSR) format. Compared to
+# giving every word its own Python list of neighbor objects, it takes a fraction of the memory and keeps
+# neighbors next to each other in memory.
+class WordGraph(object):
+
+    def __init__(self):
+        self.words = []  # ID -> word
+        self.word_ids = {}  # word -> ID
+        self.offsets = array('i', [0])
+        self.neighbor_ids = array('i')
+        self.network_numbers = array('i')  # ID -> network number, see explanation of networks below
+        # The IDs of every network's members, back to back, in the same CSR layout as the neighbors
+        self.network_offsets = array('i', [0])
+        self.network_members = array('i')
+        self.mapping = None  # The memory-mapped graph file, if the graph was loaded from one
+        # Landmark distances for the ALT estimate (see compute_landmarks). Slot j of word i, at
+        # landmark_distances[i * landmark_count + j], is the distance from the j-th landmark of word i's network.
+        self.landmark_count = 0
+        self.landmark_distances = array('H')
+        # Union-find forest filled in by build(): every word that shares a wildcard bucket with another ends up
+        # in the same tree. It's used (and then thrown away) by label_networks()
+        self.union_parents = None
+        # Changes made by add_word() and remove_word() (see INCREMENTAL UPDATES below)
+        self.changed_neighbors = {}  # ID -> array of neighbor IDs, used instead of the word's run in neighbor_ids
+        self.removed_ids = set()
+        self.network_sizes = None  # network number -> size, kept up to date once networks start to change
+        self.changed_members = {}  # network number -> array of member IDs, used instead of its run in network_members
+        self.network_changes = {}  # network number -> (IDs that joined, IDs that left), until update_networks()
+        # If set, adding or removing a letter is also a step (see CROSS-LENGTH LADDERS below)
+        self.cross_length = False
+        self.fingerprint = None  # see get_fingerprint(), worked out when first needed
+        # Goes up with every change to the words, so that anything worked out from word IDs (such as the trees of
+        # tree_cache.py) can tell when it's out of date
+        self.version = 0
+        self.word_codes = None  # ID -> packed word (see PACKED WORDS below), worked out when first needed
+
+    def __len__(self):
+        return len(self.words)
+
+    # Returns an array of the packed form of every word (see PACKED WORDS below), indexed by ID
+    def get_word_codes(self):
+        if self.word_codes is None:
+            self.word_codes = array('q', map(get_word_code, self.words))
+        return self.word_codes
+
+    # Returns a short string that identifies the dictionary (see FINGERPRINTS below). It changes whenever a word is
+    # added or removed.
+    def get_fingerprint(self):
+        if self.fingerprint is None:
+            self.fingerprint = get_words_fingerprint(self.word_ids, self.cross_length)
+        return self.fingerprint
+
+    # Returns the IDs of the words one letter change away from word ID idx
+    def get_neighbor_ids(self, idx):
+        changed = self.changed_neighbors.get(idx)
+        if changed is not None:
+            return changed
+        return self.neighbor_ids[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def get_network_count(self):
+        if self.network_sizes is not None:
+            return len(self.network_sizes)
+        return len(self.network_offsets) - 1
+
+    # Returns the number of words in a network
+    def get_network_size(self, network_number):
+        if self.network_sizes is not None:
+            return self.network_sizes[network_number]
+        return self.network_offsets[network_number + 1] - self.network_offsets[network_number]
+
+    # Returns the IDs of a network's members, in word order
+    def get_network_members(self, network_number):
+        changed = self.changed_members.get(network_number)
+        if changed is not None:
+            return changed
+        if network_number >= len(self.network_offsets) - 1:
+            return array('i')  # made by add_word() or remove_word(), and not yet listed by update_networks()
+        return self.network_members[self.network_offsets[network_number]:self.network_offsets[network_number + 1]]
+
+    # Returns the root of the union-find tree that idx belongs to. Every node on the way gets pointed straight
+    # at the root, so later lookups are quick.
+    def find_union_root(self, idx):
+        parents = self.union_parents
+        root = idx
+        while parents[root] != root:
+            root = parents[root]
+        while parents[idx] != root:
+            next_idx = parents[idx]
+            parents[idx] = root
+            idx = next_idx
+        return root
+
+    # Puts a and b in the same union-find tree
+    def union(self, a, b):
+        root_a = self.find_union_root(a)
+        root_b = self.find_union_root(b)
+        if root_a != root_b:
+            # The lower ID becomes the root, which keeps network numbering in word order (see label_networks)
+            if root_a < root_b:
+                self.union_parents[root_b] = root_a
+            else:
+                self.union_parents[root_a] = root_b
+
+    # Gives every word a network number. Networks are numbered in order of their first word, and each network's
+    # members are listed in word order. Runs in close to linear time.
+    def label_networks(self):
+        count = len(self.words)
+        if self.union_parents is None:
+            # Not built by build(), so work the trees out from the neighbor arrays
+            self.union_parents = array('i', range(count))
+            for idx in range(count):
+                for adj in self.get_neighbor_ids(idx):
+                    self.union(idx, adj)
+
+        self.network_numbers = array('i', [-1]) * count
+        for idx in range(count):
+            self.network_numbers[idx] = self.find_union_root(idx)
+        self.union_parents = None
+        # Roots are always the lowest ID in their tree, so numbering the trees in order of their first word below
+        # gives the same numbers as counting up the roots
+        self.lay_out_networks()
+
+    # Renumbers the networks so that they're numbered from 0 in order of their first word, and lays out their
+    # members, back to back. Words with a network number of -1 (removed words) are left out.
+    def lay_out_networks(self):
+        count = len(self.words)
+        # dict.fromkeys() keeps the first appearance of each network number, in order
+        old_numbers = [number for number in dict.fromkeys(self.network_numbers) if number != -1]
+        new_numbers = {old_number: number for number, old_number in enumerate(old_numbers)}
+        new_numbers[-1] = -1
+        self.network_numbers = array('i', map(new_numbers.__getitem__, self.network_numbers))
+        self.network_sizes = None
+        self.changed_members = {}
+        self.network_changes = {}
+
+        sizes = collections.Counter(self.network_numbers)
+        self.network_offsets = array('i', [0])
+        self.network_offsets.extend(itertools.accumulate(sizes[number] for number in range(len(old_numbers))))
+        # A stable sort by network number leaves each network's members in word order. Removed words sort first.
+        members = sorted(range(count), key=self.network_numbers.__getitem__)
+        self.network_members = array('i', members[sizes[-1]:])
+
+    # Gives each new word in the list an ID
+    def add_to_index(self, list_of_words):
+        self.fingerprint = None
+        self.version = self.version + 1
+        for word in list_of_words:
+            if word not in self.word_ids:
+                self.word_ids[word] = len(self.words)
+                self.words.append(word)
+
+    # Given a list of words, assign IDs and compute the neighbor arrays
+    def build(self, list_of_words, cross_length=False):
+        self.add_to_index(list_of_words)
+        self.cross_length = cross_length
+        length_neighbors = self.find_length_neighbors() if cross_length else {}
+
+        # Given a wildcard-ed word (e.g. "DOO*", "CE*T"), the wildcard-ed word is a key to a list of word IDs that
+        # match. The entry for "DOO*" would contain "DOOM" and "DOOR". Each letter position is done in turn: the keys
+        # of all the words are made once, and counted, and only the words that share their key with another word (the
+        # only ones with neighbors by changing that letter) are put in buckets. Keys of words of different lengths
+        # are different lengths too, so they never share a bucket. This is only needed while building.
+        words = self.words
+        self.union_parents = array('i', range(len(words)))
+        position_buckets = []  # letter position -> list of word ID -> the bucket of the word's key, or None
+        for l in range(max(map(len, words), default=0)):
+            # if word is "SALT", it can be found via "*ALT", "S*LT", "SA*T", and "SAL*"
+            keys = [word[:l] + "*" + word[(l + 1):] if len(word) > l else None for word in words]
+            key_counts = collections.Counter(keys)
+            wildcard_dict = {}
+            word_buckets = [None] * len(words)
+            for idx, wildcard_word in enumerate(keys):
+                if key_counts[wildcard_word] > 1 and wildcard_word is not None:
+                    ids = wildcard_dict.get(wildcard_word)
+                    if ids is None:
+                        ids = []
+                        wildcard_dict[wildcard_word] = ids
+                    ids.append(idx)
+                    word_buckets[idx] = ids
+            # Words in the same bucket are neighbors, so they're all in the same network
+            for ids in wildcard_dict.values():
+                for other in ids[1:]:
+                    self.union(ids[0], other)
+            position_buckets.append(word_buckets)
+        for idx, ids in length_neighbors.items():
+            for other in ids:
+                self.union(idx, other)
+
+        # Now that all IDs exist, lay out the neighbor connections. A word's neighbors at a letter position are the
+        # whole of its bucket (already in ID order) but itself, so the bucket is copied in and the word taken out.
+        neighbor_ids = self.neighbor_ids
+        for idx in range(len(words)):
+            for word_buckets in position_buckets:
+                ids = word_buckets[idx]
+                if ids is not None:
+                    start = len(neighbor_ids)
+                    neighbor_ids.extend(ids)
+                    del neighbor_ids[start + ids.index(idx)]
+            neighbor_ids.extend(length_neighbors.get(idx, ()))
+            self.offsets.append(len(neighbor_ids))
+        self.network_numbers = array('i', [-1]) * len(self.words)
+
+    # CROSS-LENGTH LADDERS
+    # Normally a step changes one letter, so words only ever connect to words of the same length. With cross_length
+    # set, adding or removing a letter is a step too: HEAD - HEARD, or HEAT - EAT. Comparing every pair of words of
+    # neighboring lengths would take far too long. Instead, every word is filed under each of the keys made by
+    # deleting one of its letters ("HEARD" under "EARD", "HARD", "HERD", "HEAD" and "HEAR"). This is the deletion
+    # neighborhood of the word, and works like the wildcard buckets above. A word's longer neighbors are the words
+    # filed under it, and its shorter neighbors are its keys that are words themselves. Only keys that are words
+    # can ever be looked up, so the rest aren't kept. That's a few hash lookups per word, so building stays linear in
+    # the number of words.
+    #
+    # The number of letters that differ is no longer a safe estimate of the distance between words, since TEAR -
+    # EAR - EARS takes two steps, but every letter differs. The edit distance between them (the fewest
+    # letter changes, additions and removals turning one word into the other) is used instead, see
+    # get_edit_distance(). Each step makes exactly one such edit, so it never overestimates.
+
+    # Returns a dictionary of word ID -> IDs (in increasing order) of the words one letter longer or shorter
+    def find_length_neighbors(self):
+        word_ids = self.word_ids
+        deletion_dict = {}  # shorter word -> IDs of the words it's a deletion of
+        for idx, word in enumerate(self.words):
+            # A set, because deleting either letter of a double letter gives the same key
+            for key in set([word[:l] + word[(l + 1):] for l in range(len(word))]):
+                if key in word_ids:
+                    ids = deletion_dict.get(key)
+                    if ids is None:
+                        ids = []
+                        deletion_dict[key] = ids
+                    ids.append(idx)
+        length_neighbors = {}
+        for key, ids in deletion_dict.items():
+            idx = word_ids[key]
+            length_neighbors.setdefault(idx, []).extend(ids)
+            for other in ids:
+                length_neighbors.setdefault(other, []).append(idx)
+        for ids in length_neighbors.values():
+            ids.sort()
+        return length_neighbors
+
+    # Returns the IDs of the existing words one letter longer or shorter than word, in increasing order
+    def find_length_neighbor_ids(self, word):
+        neighbors = set()
+        for l in range(len(word)):
+            idx = self.word_ids.get(word[:l] + word[(l + 1):])
+            if idx is not None:
+                neighbors.add(idx)
+        for l in range(len(word) + 1):
+            for letter in string.ascii_uppercase:
+                idx = self.word_ids.get(word[:l] + letter + word[l:])
+                if idx is not None:
+                    neighbors.add(idx)
+        return sorted(neighbors)
+
+    # INCREMENTAL UPDATES
+    # Rebuilding the whole graph to add or remove a handful of words is a waste, since a word only affects its own
+    # neighbors. Adding a word looks up every word one letter change away from it (25 per letter, each a single
+    # hash lookup), and removing one only touches the words it was connected to. The neighbor arrays themselves
+    # are left alone: the new neighbor lists of the words involved are kept in changed_neighbors, which
+    # get_neighbor_ids() checks first. Word IDs never change. A removed word keeps its ID, but it can no longer be
+    # found, has no neighbors, and belongs to no network (its network number is -1).
+    #
+    # Networks are kept correct as we go. A new word joins its neighbors' network. If those neighbors were in
+    # several networks, the word connects them, and the smaller ones are renumbered into the largest. A removed
+    # word may have been the only link between parts of its network, so we check whether its old neighbors can
+    # still reach each other, and give any part that broke off a network number of its own.
+    #
+    # After a batch of changes, update_networks() must be called to list the members of the networks that changed
+    # (Node.update_words() does this). Only those networks are looked at, so the time a batch takes depends on the
+    # words changed and the sizes of their networks, not on the size of the dictionary. Networks keep their numbers:
+    # one that breaks off gets the next free number, and one that loses all its words is left behind, empty. So
+    # networks are no longer numbered in order of their first word, until label_networks() is run again. Landmark distances don't survive new words (a new word can make a
+    # shortcut, and the landmark estimate would no longer be a lower bound), so adding a word drops them; call
+    # compute_landmarks() again if they're needed. Removing words only makes routes longer, so landmarks are kept.
+
+    # Returns the IDs of the existing words one step away from word, in the same order as build()
+    def find_neighbor_ids(self, word):
+        neighbors = []
+        for l in range(len(word)):
+            ids = []
+            for letter in string.ascii_uppercase:
+                if letter != word[l]:
+                    idx = self.word_ids.get(word[:l] + letter + word[(l + 1):])
+                    if idx is not None:
+                        ids.append(idx)
+            ids.sort()
+            neighbors.extend(ids)
+        if self.cross_length:
+            neighbors.extend(self.find_length_neighbor_ids(word))
+        return neighbors
+
+    # The arrays of a graph loaded from a file are read-only views of the file. The network numbers and packed
+    # words need to be changed in place, so they're copied out (the much bigger neighbor arrays are only ever read,
+    # so they stay shared). Also works out the network sizes, which are kept up to date from then on.
+    def prepare_for_update(self):
+        if not isinstance(self.network_numbers, array):
+            self.network_numbers = array('i', self.network_numbers)
+        if self.word_codes is not None and not isinstance(self.word_codes, array):
+            self.word_codes = array('q', self.word_codes)
+        if self.network_sizes is None:
+            self.network_sizes = array('i', [self.get_network_size(n) for n in range(self.get_network_count())])
+
+    # Gives every word reachable from word ID start the network number new_number
+    def renumber_network(self, start, new_number):
+        numbers = self.network_numbers
+        old_number = numbers[start]
+        self.network_sizes[old_number] -= 1
+        self.network_sizes[new_number] += 1
+        numbers[start] = new_number
+        queue = [start]
+        for idx in queue:
+            for adj in self.get_neighbor_ids(idx):
+                if numbers[adj] == old_number:
+                    numbers[adj] = new_number
+                    self.network_sizes[old_number] -= 1
+                    self.network_sizes[new_number] += 1
+                    queue.append(adj)
+        self.note_network_change(old_number, left=queue)
+        self.note_network_change(new_number, joined=queue)
+
+    # Notes that words joined or left a network, for update_networks()
+    def note_network_change(self, number, joined=(), left=()):
+        changes = self.network_changes.get(number)
+        if changes is None:
+            changes = ([], [])
+            self.network_changes[number] = changes
+        changes[0].extend(joined)
+        changes[1].extend(left)
+
+    # Lists the members of the networks changed since the last call (see INCREMENTAL UPDATES above). A word may
+    # have joined and left the same network, so its network number says where it ended up. The words that joined
+    # or left are put in or taken out of the member list one at a time, each a binary search and a move of the
+    # words after it. If there are too many, it's quicker to go through the whole list once instead. Returns the
+    # numbers of the networks changed.
+    def update_networks(self):
+        numbers = self.network_numbers
+        for number, (joined, left) in self.network_changes.items():
+            members = self.changed_members.get(number)
+            if members is None:
+                members = array('i', self.get_network_members(number))
+                self.changed_members[number] = members
+            if len(joined) + len(left) > MAX_MEMBER_PATCHES:
+                joined = set([idx for idx in joined if numbers[idx] == number])
+                kept = [idx for idx in members if numbers[idx] == number and idx not in joined]
+                # Both runs are in word order, so sorting them into one is a single merge
+                kept.extend(sorted(joined))
+                kept.sort()
+                self.changed_members[number] = array('i', kept)
+                continue
+            for idx in left:
+                if numbers[idx] != number:
+                    position = bisect.bisect_left(members, idx)
+                    if position < len(members) and members[position] == idx:
+                        del members[position]
+            for idx in joined:
+                if numbers[idx] == number:
+                    position = bisect.bisect_left(members, idx)
+                    if position == len(members) or members[position] != idx:
+                        members.insert(position, idx)
+        changed = list(self.network_changes)
+        self.network_changes = {}
+        return changed
+
+    # Adds a word to the graph, connecting it to its neighbors. Returns its ID (the existing one, if the word is
+    # already in the graph).
+    def add_word(self, word):
+        word = check_word(word)
+        idx = self.word_ids.get(word)
+        if idx is not None:
+            return idx
+        self.prepare_for_update()
+        neighbors = self.find_neighbor_ids(word)
+        idx = len(self.words)
+
+        # Join the largest of the neighboring networks, and bring the others into it. This is done before the
+        # word is linked in, so that renumbering a network can't spread through the new word into another one.
+        neighbor_networks = {}
+        for adj in neighbors:
+            neighbor_networks.setdefault(self.network_numbers[adj], adj)
+        if len(neighbor_networks) == 0:
+            number = len(self.network_sizes)
+            self.network_sizes.append(0)
+        else:
+            number = max(neighbor_networks.keys(), key=self.network_sizes.__getitem__)
+            for other_number, adj in neighbor_networks.items():
+                if other_number != number:
+                    self.renumber_network(adj, number)
+        self.network_numbers.append(number)
+        self.network_sizes[number] += 1
+        self.note_network_change(number, joined=[idx])
+
+        self.words.append(word)
+        self.word_ids[word] = idx
+        self.fingerprint = None
+        self.version = self.version + 1
+        if self.word_codes is not None:
+            self.word_codes.append(get_word_code(word))
+        self.link_word(idx, neighbors)
+
+        if self.landmark_count > 0:
+            self.landmark_count = 0
+            self.landmark_distances = array('H')
+        return idx
+
+    # Removes a word from the graph. Returns False if it wasn't there.
+    def remove_word(self, word):
+        word = word.upper()
+        idx = self.word_ids.get(word)
+        if idx is None:
+            return False
+        self.prepare_for_update()
+        neighbors = array('i', self.get_neighbor_ids(idx))
+        del self.word_ids[word]
+        self.fingerprint = None
+        self.version = self.version + 1
+        self.removed_ids.add(idx)
+        self.unlink_word(idx, neighbors)
+        self.network_sizes[self.network_numbers[idx]] -= 1
+        self.note_network_change(self.network_numbers[idx], left=[idx])
+        self.network_numbers[idx] = -1
+
+        # Search from all of the old neighbors at once, taking one word from each search in turn. When two searches
+        # meet, their neighbors are still connected, and the searches carry on as one. We're done when a single
+        # search is left. A search that runs out of words before then has found a part that broke off, which gets a
+        # new network number. Taking turns means that the work done is bounded by the size of the smaller parts,
+        # however big the part that's left behind is.
+        search_roots = list(range(len(neighbors)))  # search -> the search it was combined with (union-find)
+        queues = [[adj] for adj in neighbors]
+        positions = [0] * len(neighbors)
+        owners = {adj: search for search, adj in enumerate(neighbors)}  # word ID -> search that reached it first
+        active = list(range(len(neighbors)))
+        while len(active) > 1:
+            for search in list(active):
+                if search_roots[search] != search:
+                    continue  # combined with another search in this round
+                queue = queues[search]
+                if positions[search] == len(queue):
+                    active.remove(search)
+                    self.network_sizes.append(0)
+                    self.renumber_network(queue[0], len(self.network_sizes) - 1)
+                    continue
+                visiting = queue[positions[search]]
+                positions[search] += 1
+                for adj in self.get_neighbor_ids(visiting):
+                    owner = owners.get(adj)
+                    if owner is None:
+                        owners[adj] = search
+                        queue.append(adj)
+                        continue
+                    while search_roots[owner] != owner:
+                        owner = search_roots[owner]
+                    if owner != search:
+                        search_roots[owner] = search
+                        queue.extend(queues[owner][positions[owner]:])
+                        active.remove(owner)
+                if len(active) == 1:
+                    break
+        return True
+
+    # Connects the new word ID idx to its neighbors
+    def link_word(self, idx, neighbors):
+        self.changed_neighbors[idx] = array('i', neighbors)
+        for adj in neighbors:
+            changed = self.changed_neighbors.get(adj)
+            if changed is None:
+                changed = array('i', self.get_neighbor_ids(adj))
+                self.changed_neighbors[adj] = changed
+            changed.append(idx)
+
+    # Disconnects the removed word ID idx from its neighbors
+    def unlink_word(self, idx, neighbors):
+        self.changed_neighbors[idx] = array('i')
+        for adj in neighbors:
+            changed = self.changed_neighbors.get(adj)
+            if changed is None:
+                changed = array('i', self.get_neighbor_ids(adj))
+                self.changed_neighbors[adj] = changed
+            changed.remove(idx)
+
+    # Returns a freshly built copy of this graph, without the removed words or the changed neighbor lists. Word
+    # IDs are given out again, in order, skipping removed words.
+    def compacted(self):
+        graph = WordGraph()
+        graph.build([word for idx, word in enumerate(self.words) if idx not in self.removed_ids], self.cross_length)
+        graph.label_networks()
+        if self.landmark_count > 0:
+            graph.compute_landmarks(self.landmark_count)
+        return graph
+
+    # LANDMARKS
+    # The number of letters that differ between two words is a poor estimate of how many steps apart they are:
+    # NOVA and SPRY differ in 4 letters, but the shortest ladder takes 8 steps. Landmarks give a much better
+    # estimate. If we know the distance from a landmark word L to every other word, then for any two words A and
+    # B, the distance between them is at least |dist(L, A) - dist(L, B)|. (If B were any closer to A, then going
+    # from L to A and on to B would beat the known distance from L to B.) With several landmarks, we take the
+    # best of these bounds. This is known as the ALT heuristic (A-Star, Landmarks, Triangle inequality).
+    #
+    # Landmarks work best on the edges of a network, so each new one is the word farthest from the ones already
+    # chosen. Every network with more than one word gets up to landmark_count landmarks of its own.
+
+    # Runs a breadth-first search from word ID root, storing distances in the given landmark slot. Unvisited
+    # slots hold NO_LANDMARK. Returns the last word reached, which is the one farthest from root.
+    def fill_landmark_slot(self, root, slot):
+        count = self.landmark_count
+        distances = self.landmark_distances
+        distances[root * count + slot] = 0
+        queue = array('i', [root])
+        pos = 0
+        while pos < len(queue):
+            idx = queue[pos]
+            pos = pos + 1
+            dist = distances[idx * count + slot] + 1
+            for adj in self.get_neighbor_ids(idx):
+                if distances[adj * count + slot] == NO_LANDMARK:
+                    distances[adj * count + slot] = dist
+                    queue.append(adj)
+        return queue[-1]
+
+    def compute_landmarks(self, landmark_count):
+        self.landmark_count = landmark_count
+        self.landmark_distances = array('H', [NO_LANDMARK]) * (len(self.words) * landmark_count)
+        if landmark_count == 0:
+            return
+        distances = self.landmark_distances
+        for network_number in range(self.get_network_count()):
+            members = self.get_network_members(network_number)
+            if len(members) < 2:
+                continue
+            # Use the first slot to find a word on the edge of the network, then clear it again
+            landmark = self.fill_landmark_slot(members[0], 0)
+            for idx in members:
+                distances[idx * landmark_count] = NO_LANDMARK
+            for slot in range(min(landmark_count, len(members))):
+                self.fill_landmark_slot(landmark, slot)
+                # The next landmark is the word farthest from all the landmarks so far
+                farthest = -1
+                for idx in members:
+                    base = idx * landmark_count
+                    closest = min(distances[base:(base + slot + 1)])
+                    if closest > farthest:
+                        farthest = closest
+                        landmark = idx
+
+    # Returns the landmark estimate of the distance between word IDs a and b, which must be in the same network
+    def get_landmark_estimate(self, a, b):
+        count = self.landmark_count
+        distances = self.landmark_distances
+        a = a * count
+        b = b * count
+        best = 0
+        for slot in range(count):
+            dist_a = distances[a + slot]
+            if dist_a == NO_LANDMARK:
+                break  # small network with fewer landmarks
+            diff = dist_a - distances[b + slot]
+            if diff < 0:
+                diff = -diff
+            if diff > best:
+                best = diff
+        return best
+
+    # Writes the graph to a binary file, which can be loaded with WordGraph.load(). The file starts with a
+    # header, followed by the words (back to back) and then the arrays, each in machine format: the packed words,
+    # where each word starts in the word table, the word IDs in alphabetical order of their words, and the graph's
+    # own arrays. A graph changed by add_word() or remove_word() is compacted first, so its word IDs in the file may
+    # differ.
+    def save(self, file_name):
+        if len(self.changed_neighbors) > 0:
+            # The file has no room for changes, so write out the graph as if it had been built from scratch
+            self.compacted().save(file_name)
+            return
+        word_table = "".join(self.words).encode("ascii")
+        word_table = word_table + b"\0" * (-len(word_table) % 8)  # keep the arrays that follow aligned
+        word_offsets = array('i', [0])
+        word_offsets.extend(itertools.accumulate(map(len, self.words)))
+        word_order = array('i', sorted(range(len(self.words)), key=self.words.__getitem__))
+        with open(file_name, "wb") as graph_file:
+            graph_file.write(GRAPH_FILE_HEADER.pack(GRAPH_FILE_MAGIC, sys.byteorder == "little", self.cross_length,
+                                                    len(self.words), len(word_table), len(self.neighbor_ids),
+                                                    len(self.network_offsets) - 1, self.landmark_count))
+            graph_file.write(word_table)
+            # The 64-bit array goes first, while the position in the file is still a multiple of 8
+            for int_array in (self.get_word_codes(), word_offsets, word_order, self.offsets, self.neighbor_ids,
+                              self.network_numbers, self.network_offsets, self.network_members,
+                              self.landmark_distances):
+                graph_file.write(int_array)
+
+    # Opens a file written by save(). The file is memory-mapped, and everything is used right where it sits in the
+    # mapping, so nothing needs to be rebuilt, copied or decoded, however big the graph: loading takes about the
+    # same time for any number of words. Processes that load the same file share the same pages of memory. Words
+    # are read out of the word table when they're asked for (see MappedWordList), and looked up by a binary search
+    # of the alphabetical list of word IDs (see MappedWordIndex).
+    @staticmethod
+    def load(file_name):
+        with open(file_name, "rb") as graph_file:
+            mapping = mmap.mmap(graph_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, little_endian, cross_length, word_count, table_size, neighbor_count, network_count, landmark_count = \
+            GRAPH_FILE_HEADER.unpack_from(mapping)
+        if magic != GRAPH_FILE_MAGIC:
+            raise ValueError("{} is not a word graph file".format(file_name))
+        if little_endian != (sys.byteorder == "little"):
+            raise ValueError("{} was written on a machine with a different byte order".format(file_name))
+
+        graph = WordGraph()
+        graph.mapping = mapping
+        graph.cross_length = cross_length
+        view = memoryview(mapping)
+        table_start = GRAPH_FILE_HEADER.size
+        pos = table_start + table_size
+
+        def _array_view(count, typecode='i'):
+            nonlocal pos
+            size = count * struct.calcsize(typecode)
+            array_view = view[pos:(pos + size)].cast(typecode)
+            pos = pos + size
+            return array_view
+
+        graph.word_codes = _array_view(word_count, 'q')
+        graph.words = MappedWordList(mapping, table_start, _array_view(word_count + 1))
+        graph.word_ids = MappedWordIndex(graph.words, _array_view(word_count))
+        graph.offsets = _array_view(word_count + 1)
+        graph.neighbor_ids = _array_view(neighbor_count)
+        graph.network_numbers = _array_view(word_count)
+        graph.network_offsets = _array_view(network_count + 1)
+        graph.network_members = _array_view(word_count)
+        graph.landmark_count = landmark_count
+        graph.landmark_distances = _array_view(word_count * landmark_count, 'H')
+        return graph
+
+GRAPH_FILE_MAGIC = b"WLGRAPH3"
+# magic, little endian flag, cross-length flag, word count, word table size in bytes, neighbor count, network count,
+# landmark count
+GRAPH_FILE_HEADER = struct.Struct("<8s??2xIIIII")
+NO_LANDMARK = 0xFFFF
+# Above this many words joining or leaving a network in one batch, update_networks() lists its members again
+MAX_MEMBER_PATCHES = 100
+
+# ID -> word, for a graph loaded from a file. Each word is read out of the mapped word table when it's asked for.
+# Words added after loading are kept in a list of their own.
+class MappedWordList(object):
+
+    def __init__(self, mapping, table_start, word_offsets):
+        self.mapping = mapping
+        self.table_start = table_start
+        self.word_offsets = word_offsets  # ID -> position of the word in the word table (plus the end of the table)
+        self.added = []
+
+    def __len__(self):
+        return len(self.word_offsets) - 1 + len(self.added)
+
+    def get_bytes(self, idx):
+        return self.mapping[(self.table_start + self.word_offsets[idx]):(self.table_start + self.word_offsets[idx + 1])]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        count = len(self.word_offsets) - 1
+        if idx < 0:
+            idx = idx + len(self)
+        if idx >= count:
+            return self.added[idx - count]
+        if idx < 0:
+            raise IndexError("word ID out of range")
+        return self.get_bytes(idx).decode("ascii")
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def append(self, word):
+        self.added.append(word)
+
+# Word -> ID, for a graph loaded from a file. A word is found by a binary search of the IDs in alphabetical order of
+# their words, reading the words it compares against straight out of the mapping, so nothing is built when the file
+# is loaded. Words added or removed after loading are noted alongside.
+class MappedWordIndex(object):
+
+    def __init__(self, words, word_order):
+        self.words = words
+        self.word_order = word_order  # word IDs, in alphabetical order of their words
+        self.added = {}  # word -> ID
+        self.removed = set()  # IDs
+
+    # Returns the ID the word has in the file, or None
+    def find(self, word):
+        try:
+            key = word.encode("ascii")
+        except UnicodeEncodeError:
+            return None
+        word_order = self.word_order
+        mapping = self.words.mapping
+        table_start = self.words.table_start
+        word_offsets = self.words.word_offsets
+        low = 0
+        high = len(word_order)
+        while low < high:
+            middle = (low + high) // 2
+            idx = word_order[middle]
+            if mapping[(table_start + word_offsets[idx]):(table_start + word_offsets[idx + 1])] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(word_order) and self.words.get_bytes(word_order[low]) == key:
+            return word_order[low]
+        return None
+
+    def get(self, word, default=None):
+        idx = self.added.get(word)
+        if idx is not None:
+            return idx
+        idx = self.find(word)
+        if idx is None or idx in self.removed:
+            return default
+        return idx
+
+    def __getitem__(self, word):
+        idx = self.get(word)
+        if idx is None:
+            raise KeyError(word)
+        return idx
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __setitem__(self, word, idx):
+        self.added[word] = idx
+
+    def __delitem__(self, word):
+        idx = self[word]
+        if self.added.pop(word, None) is None:
+            self.removed.add(idx)
+
+    def __len__(self):
+        return len(self.word_order) - len(self.removed) + len(self.added)
+
+    def __iter__(self):
+        for idx in range(len(self.word_order)):
+            if idx not in self.removed:
+                yield self.words[idx]
+        yield from list(self.added)
+
+# LAZY GRAPHS
+# Building the neighbor arrays of a big dictionary takes a lot of time and memory (about 25 seconds and 600 MB for
+# a million five-letter words), but a game usually only looks at the neighbors of a small part of the graph. A
+# LazyWordGraph only builds the word index. The first time a word's neighbors are asked for, they are looked up in
+# the index (find_neighbor_ids(), 25 lookups per letter), and the answer is kept in a cache of up to cache_size
+# words, throwing out the least recently used word when full. Neighbors come out in the same order as in a built
+# graph, so the solvers give exactly the same ladders.
+#
+# Networks are still worked out in full, so that games between words that aren't connected are rejected up front
+# (a search would otherwise have to go through the whole network to find that out, which can take a very long
+# time for the depth-first solvers). That doesn't need the neighbor arrays: two words of the same length are
+# neighbors when cutting the same letter out of both leaves the same key, so label_networks() files the words
+# under their keys one letter position at a time, joining the words filed together, and only keeps the keys of one
+# position at a time. It's the same union-find as build() (see label_networks() of WordGraph), without the
+# neighbor lists. Adding and removing words keeps the networks up to date just as in a built graph, except that
+# the neighbors of the words affected are forgotten from the cache instead of being changed. A lazy graph is saved
+# by building it in full.
+
+DEFAULT_NEIGHBOR_CACHE_SIZE = 100000
+
+class LazyWordGraph(WordGraph):
+
+    def __init__(self, cache_size=DEFAULT_NEIGHBOR_CACHE_SIZE):
+        WordGraph.__init__(self)
+        self.cache_size = cache_size
+        self.neighbor_cache = collections.OrderedDict()  # ID -> array of neighbor IDs, least recently used first
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def get_neighbor_ids(self, idx):
+        neighbors = self.neighbor_cache.get(idx)
+        if neighbors is not None:
+            self.cache_hits = self.cache_hits + 1
+            try:
+                self.neighbor_cache.move_to_end(idx)
+            except KeyError:
+                pass  # thrown out by another thread in the meantime
+            return neighbors
+        self.cache_misses = self.cache_misses + 1
+        if idx in self.removed_ids:
+            return array('i')
+        neighbors = array('i', self.find_neighbor_ids(self.words[idx]))
+        if self.cache_size > 0:
+            while len(self.neighbor_cache) >= self.cache_size:
+                try:
+                    self.neighbor_cache.popitem(last=False)
+                except KeyError:
+                    break
+            self.neighbor_cache[idx] = neighbors
+        return neighbors
+
+    # Only gives the words their IDs
+    def build(self, list_of_words, cross_length=False):
+        self.add_to_index(list_of_words)
+        self.cross_length = cross_length
+        self.network_numbers = array('i', [-1]) * len(self.words)
+
+    # Works out the networks from the word index (see LAZY GRAPHS above)
+    def label_networks(self):
+        words = self.words
+        removed_ids = self.removed_ids
+        self.union_parents = array('i', range(len(words)))
+        for l in range(max(map(len, words), default=0)):
+            # Keys of words of different lengths are different lengths too, so they never get mixed up
+            first_ids = {}  # word with letter l cut out -> ID of the first word filed under it
+            for idx, word in enumerate(words):
+                if len(word) > l and idx not in removed_ids:
+                    first = first_ids.setdefault(word[:l] + word[(l + 1):], idx)
+                    if first != idx:
+                        self.union(first, idx)
+        if self.cross_length:
+            # A word and the words it becomes with a letter deleted are neighbors
+            for idx, word in enumerate(words):
+                if idx not in removed_ids:
+                    for l in range(len(word)):
+                        other = self.word_ids.get(word[:l] + word[(l + 1):])
+                        if other is not None:
+                            self.union(idx, other)
+
+        self.network_numbers = array('i', [-1]) * len(words)
+        for idx in range(len(words)):
+            if idx not in removed_ids:
+                self.network_numbers[idx] = self.find_union_root(idx)
+        self.union_parents = None
+        self.lay_out_networks()
+
+    # The neighbors of a word are only ever cached, so forgetting them is enough to connect a new word
+    def link_word(self, idx, neighbors):
+        for adj in neighbors:
+            self.neighbor_cache.pop(adj, None)
+
+    def unlink_word(self, idx, neighbors):
+        self.neighbor_cache.pop(idx, None)
+        for adj in neighbors:
+            self.neighbor_cache.pop(adj, None)
+
+    def save(self, file_name):
+        self.compacted().save(file_name)
+
+    def get_cache_stats(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'entries': len(self.neighbor_cache)}
+
+# PACKED WORDS
+# The number of letters that differ between two words is worked out for every neighbor an A-Star search looks at,
+# so it pays to make it fast. Comparing the words a letter at a time takes a trip round the interpreter loop for
+# every letter. Instead, each word is packed into an integer (its code), LETTER_BITS bits per letter: A is 1, B is
+# 2, and so on, with the last letter in the lowest bits. SEED is 10011 00101 00101 00100.
+#
+# XOR-ing the codes of two words of the same length leaves zero in the bits (the "lane") of every letter that
+# matches, and something else in every lane that doesn't. Adding 01111 to the low four bits of every lane at once
+# carries into the top bit of a lane if anything was set in those four bits. It never carries out of the lane, so
+# all the lanes are done by one addition. OR-ing in the XOR-ed codes picks up lanes where only the top bit was set.
+# Then the top bit of each lane is set if and only if its letters differ, and counting the set bits gives the
+# distance. That's a handful of integer operations, however long the words are, instead of a loop.
+#
+# get_code_distances() does the same for a whole array of words at once (such as a word's neighbors), which saves
+# a function call per word.
+
+LETTER_BITS = 5
+MAX_PACKED_LETTERS = 12  # enough for any word in the dictionary, and the codes still fit in 64 bits
+LANE_LOW_BITS = int("01111" * MAX_PACKED_LETTERS, 2)
+LANE_TOP_BITS = int("10000" * MAX_PACKED_LETTERS, 2)
+
+# int.bit_count() is new in Python 3.10
+if hasattr(int, "bit_count"):
+    count_set_bits = int.bit_count
+else:
+    def count_set_bits(bits):
+        return bin(bits).count("1")
+
+def get_word_code(word):
+    code = 0
+    for letter in word:
+        code = (code << LETTER_BITS) | (ord(letter) & 31)
+    return code
+
+# Returns the number of letters that differ between the words with the given codes (of words of the same length)
+def get_code_distance(code1, code2):
+    diff = code1 ^ code2
+    return count_set_bits((((diff & LANE_LOW_BITS) + LANE_LOW_BITS) | diff) & LANE_TOP_BITS)
+
+# Returns a list of the distances from the word with the given code to each of the words in ids, whose codes are in
+# codes (as returned by WordGraph.get_word_codes())
+def get_code_distances(codes, ids, code):
+    low_bits = LANE_LOW_BITS
+    top_bits = LANE_TOP_BITS
+    distances = []
+    for idx in ids:
+        diff = codes[idx] ^ code
+        distances.append(count_set_bits((((diff & low_bits) + low_bits) | diff) & top_bits))
+    return distances
+
+# FINGERPRINTS
+# Anything worked out from a dictionary (such as the answers kept by result_cache.py) is only good for as long as
+# the dictionary stays the same. A fingerprint is a hash of the words, so two graphs with the same fingerprint have
+# the same words (and the same kind of steps), however they were built or loaded. The words of each length are
+# hashed on their own, in sorted order, and then those hashes are hashed together, so a graph split into shards
+# has the same fingerprint as the whole graph, without having to load every shard to work it out.
+
+# Returns the hash of a sorted list of words, all of the same length
+def get_length_fingerprint(sorted_words):
+    return hashlib.blake2b("\n".join(sorted_words).encode("ascii"), digest_size=16).hexdigest()
+
+# Combines a dictionary of word length -> hash of the words of that length into one fingerprint
+def combine_fingerprints(length_fingerprints, cross_length=False):
+    digest = hashlib.blake2b(b"cross_length\n" if cross_length else b"single_length\n", digest_size=16)
+    for length in sorted(length_fingerprints):
+        digest.update("{} {}\n".format(length, length_fingerprints[length]).encode("ascii"))
+    return digest.hexdigest()
+
+def get_words_fingerprint(words, cross_length=False):
+    words_by_length = {}
+    for word in words:
+        words_by_length.setdefault(len(word), []).append(word)
+    return combine_fingerprints({length: get_length_fingerprint(sorted(words_by_length[length]))
+                                 for length in words_by_length}, cross_length)
+
+# GRAPH SHARDS
+# A step never changes the length of a word (unless cross_length is set), so the words of each length form a graph
+# of their own. Those graphs are built separately, each by a worker process of a pool, and each is saved as a
+# graph file of its own (a shard), with its own networks. A ShardedWordGraph puts the shards together
+# into one graph, but only loads a shard (memory-mapped, see WordGraph.load) the first time a game needs a word of
+# that length. A server that only ever answers four-letter games never loads the other shards.
+#
+# Word IDs run on from one shard to the next, in order of length, so every word still has an ID of its own: the
+# first word of each shard has an ID one higher than the last word of the shard before. The shards store their
+# neighbor IDs and network members already offset, so the neighbor arrays are used as they are. Network numbers
+# are offset in the same way, but as they're looked up. A manifest file in the shard directory lists the
+# shards, with their numbers of words and networks, so the IDs are known before any shard is loaded.
+#
+# The shards are read-only: words can't be added or removed, and there are no landmarks. The distance oracle and
+# puzzle generator need the whole graph, so they don't work with shards.
+
+SHARD_MANIFEST = "manifest.json"
+
+def get_shard_file_name(shard_dir, length):
+    return os.path.join(shard_dir, "words{}.graph".format(length))
+
+# Builds the shard of the given words (all the same length, and sorted), with IDs starting at base, and saves it.
+# Runs in a worker process. Returns the number of networks in the shard, and the fingerprint of its words.
+def build_shard(shard_dir, length, words, base):
+    graph = WordGraph()
+    graph.build(words)
+    graph.label_networks()
+    if base > 0:
+        graph.neighbor_ids = array('i', map(base.__add__, graph.neighbor_ids))
+        graph.network_members = array('i', map(base.__add__, graph.network_members))
+    graph.save(get_shard_file_name(shard_dir, length))
+    return graph.get_network_count(), get_length_fingerprint(words)
+
+# Splits the words up by length and builds a shard for each length, workers at a time (one per core by default),
+# in shard_dir. Writes the manifest last, so a shard directory with a manifest is always complete.
+def build_shards(list_of_words, shard_dir, workers=None):
+    words_by_length = {}
+    for word in list_of_words:
+        words_by_length.setdefault(len(word), []).append(word)
+    lengths = sorted(words_by_length)
+    bases = [0]
+    for length in lengths:
+        words_by_length[length].sort()
+        bases.append(bases[-1] + len(words_by_length[length]))
+
+    os.makedirs(shard_dir, exist_ok=True)
+    # Forked workers start at once, without importing anything again
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = [pool.submit(build_shard, shard_dir, length, words_by_length[length], base)
+                   for length, base in zip(lengths, bases)]
+        results = [future.result() for future in futures]
+
+    shards = [{'length': length, 'words': len(words_by_length[length]), 'networks': network_count,
+               'fingerprint': fingerprint}
+              for length, (network_count, fingerprint) in zip(lengths, results)]
+    with open(os.path.join(shard_dir, SHARD_MANIFEST), "w") as manifest_file:
+        json.dump({'shards': shards}, manifest_file, indent=2)
+
+class ShardedWordGraph(object):
+
+    def __init__(self, shard_dir):
+        manifest_name = os.path.join(shard_dir, SHARD_MANIFEST)
+        try:
+            with open(manifest_name) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            raise ValueError("{} is not a shard directory".format(shard_dir))
+        self.shard_dir = shard_dir
+        self.lengths = [shard['length'] for shard in manifest['shards']]  # shard -> word length
+        self.shard_numbers = {length: i for i, length in enumerate(self.lengths)}  # word length -> shard
+        self.bases = [0]  # shard -> ID of its first word (plus one more entry, the total number of words)
+        self.network_bases = [0]  # shard -> number of its first network (plus the total number of networks)
+        for shard in manifest['shards']:
+            self.bases.append(self.bases[-1] + shard['words'])
+            self.network_bases.append(self.network_bases[-1] + shard['networks'])
+        self.shards = [None] * len(self.lengths)  # shard -> WordGraph, once loaded
+        self.load_lock = threading.Lock()
+        # The parts of the WordGraph interface that the solvers use
+        self.words = ShardedWordList(self)
+        self.word_ids = ShardedWordIndex(self)
+        self.network_numbers = ShardedNetworkNumbers(self)
+        self.landmark_count = 0
+        self.cross_length = False
+        # shard -> fingerprint of its words (see FINGERPRINTS above). Shards built before manifests had these are
+        # loaded to work them out.
+        self.length_fingerprints = [shard.get('fingerprint') for shard in manifest['shards']]
+        self.fingerprint = None
+        self.version = 0  # shards can't be changed
+        self.word_codes = None  # as for a WordGraph, but only filled in for the shards that are loaded
+
+    def __len__(self):
+        return self.bases[-1]
+
+    def get_fingerprint(self):
+        if self.fingerprint is None:
+            for i, fingerprint in enumerate(self.length_fingerprints):
+                if fingerprint is None:
+                    self.length_fingerprints[i] = get_length_fingerprint(self.get_shard(i).words)
+            self.fingerprint = combine_fingerprints(dict(zip(self.lengths, self.length_fingerprints)))
+        return self.fingerprint
+
+    # Returns shard i, loading it if this is the first time it's needed
+    def get_shard(self, i):
+        shard = self.shards[i]
+        if shard is None:
+            with self.load_lock:
+                shard = self.shards[i]
+                if shard is None:
+                    shard = WordGraph.load(get_shard_file_name(self.shard_dir, self.lengths[i]))
+                    if self.word_codes is not None:
+                        self.copy_word_codes(self.word_codes, i, shard)
+                    self.shards[i] = shard
+        return shard
+
+    def get_word_codes(self):
+        if self.word_codes is None:
+            with self.load_lock:
+                if self.word_codes is None:
+                    word_codes = array('q', [0]) * len(self)
+                    for i, shard in enumerate(self.shards):
+                        if shard is not None:
+                            self.copy_word_codes(word_codes, i, shard)
+                    self.word_codes = word_codes
+        return self.word_codes
+
+    # Copies the packed words of shard i into word_codes. The shard's are a view of its file, so they're copied as
+    # bytes.
+    def copy_word_codes(self, word_codes, i, shard):
+        word_codes[self.bases[i]:self.bases[i + 1]] = array('q', bytes(shard.get_word_codes()))
+
+    # Returns the number of the shard that holds word ID idx
+    def find_shard(self, idx):
+        return bisect.bisect_right(self.bases, idx) - 1
+
+    def get_loaded_lengths(self):
+        return [length for length, shard in zip(self.lengths, self.shards) if shard is not None]
+
+    def get_neighbor_ids(self, idx):
+        i = bisect.bisect_right(self.bases, idx) - 1
+        shard = self.shards[i]
+        if shard is None:
+            shard = self.get_shard(i)
+        idx = idx - self.bases[i]
+        return shard.neighbor_ids[shard.offsets[idx]:shard.offsets[idx + 1]]
+
+    def get_network_count(self):
+        return self.network_bases[-1]
+
+    def get_network_size(self, network_number):
+        i = bisect.bisect_right(self.network_bases, network_number) - 1
+        return self.get_shard(i).get_network_size(network_number - self.network_bases[i])
+
+    def get_network_members(self, network_number):
+        i = bisect.bisect_right(self.network_bases, network_number) - 1
+        return self.get_shard(i).get_network_members(network_number - self.network_bases[i])
+
+    def get_landmark_estimate(self, a, b):
+        return 0
+
+# ID -> word, for a ShardedWordGraph
+class ShardedWordList(object):
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __len__(self):
+        return len(self.graph)
+
+    def __getitem__(self, idx):
+        i = self.graph.find_shard(idx)
+        return self.graph.get_shard(i).words[idx - self.graph.bases[i]]
+
+# Word -> ID, for a ShardedWordGraph. Only the shard of the word's length is looked at.
+class ShardedWordIndex(object):
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def get(self, word, default=None):
+        i = self.graph.shard_numbers.get(len(word))
+        if i is None:
+            return default
+        idx = self.graph.get_shard(i).word_ids.get(word)
+        if idx is None:
+            return default
+        return idx + self.graph.bases[i]
+
+    def __getitem__(self, word):
+        idx = self.get(word)
+        if idx is None:
+            raise KeyError(word)
+        return idx
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+# ID -> network number, for a ShardedWordGraph
+class ShardedNetworkNumbers(object):
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __len__(self):
+        return len(self.graph)
+
+    def __getitem__(self, idx):
+        i = self.graph.find_shard(idx)
+        return self.graph.get_shard(i).network_numbers[idx - self.graph.bases[i]] + self.graph.network_bases[i]
+
+# This is a base class, meant to be subclassed by the different algorithms. A node is a thin view onto one word
+# of the WordGraph.
 class Node(object):
 
-    node_list = []
-    # Given a wildcard-ed word (e.g. "DOO*", "CE*T"), the wildcard-ed word is a key to a list of nodes that match
-    # The entry for "DOO*" would contain "DOOM" and "DOOR"
-    wildcard_node_dict = {}
+    __slots__ = ('id', 'word')
+
+    node_list = []  # ID -> node
+    graph = WordGraph()
 
     # Each node is a part of a network of mutually connected nodes, each network has own number
     # Contains lists of nodes, one for each network
@@ -30,12 +1178,20 @@ class Node(object):
     factory_func = None
 
     def __init__(self, word):
+        self.id = Node.graph.word_ids[word]
         self.word = word
-        self.neighbors = []
-        self.network_number = -1 # See explanation of networks above
 
-    def add_neighbor(self, node):
-        self.neighbors.append(node)
+    @property
+    def neighbors(self):
+        return list(map(Node.node_list.__getitem__, Node.graph.get_neighbor_ids(self.id)))
+
+    @property
+    def network_number(self):
+        return Node.graph.network_numbers[self.id]
+
+    @network_number.setter
+    def network_number(self, value):
+        Node.graph.network_numbers[self.id] = value
 
     # Returns a copy of the neighbor list, but in random order
     def get_randomized_neighbor_list(self):
@@ -51,11 +1207,15 @@ class Node(object):
     # The actual solution might take more steps than that.
     def get_word_distance(self, other_node):
         if self is other_node: return 0
-        dist = 0
-        for idx in range(len(self.word)):
-            if self.word[idx] != other_node.word[idx]:
-                dist = dist + 1
-        return dist
+        if Node.graph.cross_length:
+            return get_edit_distance(self.word, other_node.word)
+        codes = Node.graph.get_word_codes()
+        return get_code_distance(codes[self.id], codes[other_node.id])
+
+    # Like get_word_distance(), but also uses the landmarks (if the graph has any), which usually gives a much
+    # closer estimate. The other node must be in the same network.
+    def get_landmark_estimate(self, other_node):
+        return max(Node.graph.get_landmark_estimate(self.id, other_node.id), self.get_word_distance(other_node))
 
     # Returns a list of neighboring words
     def list_matches(self):
@@ -73,102 +1233,266 @@ class Node(object):
         else:
             return Node(word)
 
-    # Given a list of words, generate all the nodes
+    # Given a list of words, generate all the nodes. If cross_length is set, adding or removing a letter is a step.
     @staticmethod
-    def populate_nodes_from_word_list(list_of_words):
-        # Construct all the nodes and populate the wildcard node dictionary
-        for word in list_of_words:
-            node = Node.make_node(word)
-            Node.node_list.append(node)
-            # if word is "SALT", it can be found via "*ALT", "S*LT", "SA*T", and "SAL*"
-            for l in range(len(word)):
-                wildcard_word = word[:l] + "*" + word[(l + 1):]
-                nodes = Node.wildcard_node_dict.get(wildcard_word)
-                if nodes is None:
-                    nodes = []
-                    Node.wildcard_node_dict[wildcard_word] = nodes
-                nodes.append(node)
-
-        # Now that all nodes exist, set the neighbor connections
-        for node in Node.node_list:
-            word = node.word
-            for l in range(len(word)):
-                wildcard_word = word[:l] + "*" + word[(l + 1):]
-                nodes = Node.wildcard_node_dict.get(wildcard_word)
-                if nodes is not None:
-                    for adj in nodes:
-                        if adj is not node:
-                            node.add_neighbor(adj)
-
-    # Given a word, return the appropriate node, if it exists.
+    def populate_nodes_from_word_list(list_of_words, cross_length=False):
+        Node.graph = WordGraph()
+        Node.graph.build(list_of_words, cross_length)
+        Node.node_list = [Node.make_node(word) for word in Node.graph.words]
+
+    # Like populate_nodes_from_word_list(), but the graph is a LazyWordGraph and nodes are only made when they're
+    # first needed (see LazyNodeList)
+    @staticmethod
+    def populate_nodes_lazily(list_of_words, cross_length=False, cache_size=DEFAULT_NEIGHBOR_CACHE_SIZE):
+        Node.graph = LazyWordGraph(cache_size)
+        Node.graph.build(list_of_words, cross_length)
+        Node.node_list = LazyNodeList()
+
+    # Uses the shards in shard_dir (see ShardedWordGraph). Nodes are only made when they're first needed.
+    @staticmethod
+    def populate_nodes_from_shards(shard_dir):
+        Node.graph = ShardedWordGraph(shard_dir)
+        Node.node_list = LazyNodeList()
+        Node.gather_networks()
+
+    # Uses a graph that was loaded with all its connections and networks already worked out. Nodes are only made
+    # when they're first needed, so that loading a big graph file stays quick.
+    @staticmethod
+    def populate_nodes_from_graph(graph):
+        Node.graph = graph
+        Node.node_list = LazyNodeList()
+        Node.gather_networks()
+
+    # Points Node.networks at the network members recorded on the graph
+    @staticmethod
+    def gather_networks():
+        Node.networks = NetworkNodeLists()
+
+    # Given a word, return the appropriate node, if it exists. The graph's word -> ID dictionary is the index, so
+    # this is a single hash lookup no matter how many words share a wildcard pattern with this one.
     @staticmethod
     def find_node(word):
-        for l in range(len(word)):
-            wildcard_word = word[:l] + "*" + word[(l+1):]
-            nodes = Node.wildcard_node_dict.get(wildcard_word)
-            if nodes is not None:
-                for node in nodes:
-                    if node.word == word:
-                        return node
+        idx = Node.graph.word_ids.get(word)
+        if idx is None:
             return None
+        return Node.node_list[idx]
 
     # Determines what nodes belong to what networks. This is useful because no connection is possible between
     # nodes in separate networks
     @staticmethod
     def find_isolated_nodes():
-        current_network = 0
-        while(True):
-            # find a node without a network tag
-            start_node = None
-            for n in Node.node_list:
-                if n.network_number == -1:
-                    start_node = n
-                    break
-            if start_node is None:
-                # We've processed all the nodes, exit while loop
-                break
+        Node.graph.label_networks()
+        Node.gather_networks()
+
+    # Removes and adds words in place, without rebuilding the graph (see WordGraph.add_word). Nodes are made for
+    # the new words. The nodes of removed words are left in node_list, but can no longer be found. Only the
+    # networks that changed are listed again. Raises ValueError, before changing anything, if an added word isn't
+    # a word (see check_word), or if the graph is split into shards, which are read-only. Returns the words removed
+    # and the words added, leaving out those that weren't in the graph or already were.
+    @staticmethod
+    def update_words(added_words=(), removed_words=()):
+        graph = Node.graph
+        check_graph_can_change(graph)
+        added_words = [check_word(word) for word in added_words]
+        removed = [word.upper() for word in removed_words if graph.remove_word(word)]
+        count = len(graph)
+        added = [word for word in added_words if graph.add_word(word) >= count]
+        graph.update_networks()
+        Node.node_list.extend(Node.make_node(word) for word in graph.words[len(Node.node_list):])
+        return removed, added
+
+# Stands in for Node.networks: the list of the nodes in a network is made when it's asked for, from the graph's
+# list of its members, so nothing needs doing when the networks change
+class NetworkNodeLists(object):
+
+    def __len__(self):
+        return Node.graph.get_network_count()
+
+    def __getitem__(self, network_number):
+        if network_number < 0 or network_number >= len(self):
+            raise IndexError("network number out of range")
+        return [Node.node_list[idx] for idx in Node.graph.get_network_members(network_number)]
+
+# Stands in for Node.node_list with a lazy, sharded or loaded graph. A word's node is made the first time it's
+# asked for, and then kept, so a word always has the same node (the solvers compare nodes by identity). Only the
+# words that games have touched get nodes.
+class LazyNodeList(object):
+
+    def __init__(self):
+        self.nodes = {}  # ID -> node
+
+    def __len__(self):
+        return len(Node.graph)
+
+    def __getitem__(self, idx):
+        node = self.nodes.get(idx)
+        if node is None:
+            # setdefault(), so that if two threads make the same node at once, both get the same one
+            node = self.nodes.setdefault(idx, Node.make_node(Node.graph.words[idx]))
+        return node
+
+    def extend(self, nodes):
+        for node in nodes:
+            self.nodes.setdefault(node.id, node)
 
-            nodes_in_network = []
+# WORD FILES
+# Word files are read a chunk at a time, so that a large text (or a pile of them) never has to fit in memory. A
+# word can be split across two chunks, so the letters at the very end of a chunk are held back and put in front
+# of the next one. Only the words we keep (3 to 5 letters) are remembered, so memory use depends on the size of the
+# vocabulary, not the size of the text: at most 26^3 + 26^4 + 26^5 distinct words, however large the input.
+# Files may be gzip-compressed; they are recognized by their first two bytes, not by name.
 
-            # open_list will contain nodes we need to visit, b/c they're connected to a node we've already been to.
-            open_list = [start_node]
-            while len(open_list) > 0:
-                node = open_list.pop(0)
-                for m in node.neighbors:
-                    if m.network_number == -1 and m not in open_list:
-                        open_list.append(m)
-                nodes_in_network.append(node)
-                node.network_number = current_network
+WORD_FILE_CHUNK_SIZE = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+MIN_WORD_LENGTH = 3
+MAX_WORD_LENGTH = 5
+# A run of letters of the right length, with no letter on either side of it. Chunks are decoded as Latin-1, which
+# maps each byte to one character, so a UTF-8 character split between chunks can't cause a decoding error, and
+# its bytes (all 0x80 or above) never count as letters.
+word_pattern = re.compile("(?<![a-zA-Z])[a-zA-Z]{%d,%d}(?![a-zA-Z])" % (MIN_WORD_LENGTH, MAX_WORD_LENGTH))
 
-            # We've completed a network
-            Node.networks.append(nodes_in_network)
-            current_network = current_network + 1
+# Returns a word given by hand in upper case, as the words read from word files are. Raises ValueError if it isn't
+# a word that could have been read from one.
+def check_word(word):
+    if word_pattern.fullmatch(word) is None:
+        raise ValueError("{!r} is not a word of {} to {} letters".format(word, MIN_WORD_LENGTH, MAX_WORD_LENGTH))
+    return word.upper()
 
+def open_word_file(file_name):
+    words_file = open(file_name, "rb")
+    if words_file.read(2) == GZIP_MAGIC:
+        words_file.close()
+        return gzip.open(file_name, "rb")
+    words_file.seek(0)
+    return words_file
+
+# Yields the words of the right length in a file, in upper case and in the order they appear (with repeats)
+def read_words(file_name, chunk_size=WORD_FILE_CHUNK_SIZE):
+    with open_word_file(file_name) as words_file:
+        carry = ""
+        while True:
+            chunk = words_file.read(chunk_size)
+            if len(chunk) == 0:
+                break
+            text = carry + chunk.decode("latin-1")
+            split = len(text.rstrip(string.ascii_letters))
+            # A word longer than MAX_WORD_LENGTH can't be used however long it is, so one letter more than that
+            # is enough to remember. This keeps the carry small even if a "word" runs on for megabytes.
+            carry = text[split:(split + MAX_WORD_LENGTH + 1)]
+            yield from map(str.upper, word_pattern.findall(text, 0, split))
+        yield from map(str.upper, word_pattern.findall(carry))
+
+# src_file is a word file name, or a list of them. If None, the three and four-letter word lists in data/ are used.
 def process_text_files(src_file=None):
-    global word_list
+    global word_list, word_positions
     # Process the text files
     file_list = []
     if src_file is None:
         file_list = file_list + [os.path.join("data", "FourLetterWords.txt"), os.path.join("data", "ThreeLetterWords.txt")]
-    else:
+    elif isinstance(src_file, str):
         file_list.append(src_file)
+    else:
+        file_list = file_list + list(src_file)
 
     word_set = set()
     for f_name in file_list:
-        with open(f_name) as words_file:
-            lines = words_file.readlines()
-            for line in lines:
-                words = re.findall("[a-zA-Z]+", line)
-                for word in words:
-                    uc = word.upper()
-                    if len(uc) >= 3 and len(uc) <= 5:
-                        word_set.add(uc)
+        word_set.update(read_words(f_name))
     word_list = list(word_set)
+    word_positions = None
 
-def create_nodes(word_file=None):
+# If graph_file is given and exists, the whole graph is loaded from it and word_file is ignored. Otherwise the
+# graph is built from the word file (or list of word files), and saved to graph_file (if given) for next time.
+# landmark_count is the number of landmarks to pick in each network (see WordGraph.compute_landmarks), if any.
+# If cross_length is set, adding or removing a letter also counts as a step (a loaded graph keeps whichever it was
+# saved with). If lazy is set, and the graph isn't loaded from a file, it's a LazyWordGraph with a cache of
+# neighbor_cache_size words (DEFAULT_NEIGHBOR_CACHE_SIZE if None). A lazy graph isn't saved to graph_file, because
+# that would mean building it in full.
+#
+# If shard_dir is given, the graph is split into shards by word length (see ShardedWordGraph) instead. If the shard
+# directory doesn't have a manifest yet, the shards are built there from the word file, shard_workers at a time.
+# Shards are graph files of their own, are never lazy and have no landmarks, so giving graph_file, lazy,
+# landmark_count, neighbor_cache_size or cross_length as well raises ValueError.
+def create_nodes(word_file=None, graph_file=None, landmark_count=0, cross_length=False, lazy=False,
+                 neighbor_cache_size=None, shard_dir=None, shard_workers=None):
+    global word_list, word_positions
+    word_positions = None
+    if shard_dir is not None:
+        if cross_length:
+            raise ValueError("A graph split by word length can't join words of different lengths")
+        if graph_file is not None:
+            raise ValueError("A graph split by word length is kept in its shard directory, not in a graph file")
+        if lazy or neighbor_cache_size is not None:
+            raise ValueError("A graph split by word length can't be lazy")
+        if landmark_count > 0:
+            raise ValueError("A graph split by word length has no landmarks")
+        if not os.path.exists(os.path.join(shard_dir, SHARD_MANIFEST)):
+            process_text_files(word_file)
+            build_shards(word_list, shard_dir, shard_workers)
+            word_list = []
+        Node.populate_nodes_from_shards(shard_dir)
+        # Picking a random word from this only loads the shard it's in
+        word_list = Node.graph.words
+        return
+    if graph_file is not None and os.path.exists(graph_file):
+        Node.populate_nodes_from_graph(WordGraph.load(graph_file))
+        # Picking a random word from this only reads that word from the file
+        word_list = Node.graph.words
+        if Node.graph.landmark_count < landmark_count:
+            # The file was saved with fewer landmarks, work them out here (the file isn't changed)
+            Node.graph.compute_landmarks(landmark_count)
+        return
     process_text_files(word_file)
-    Node.populate_nodes_from_word_list(word_list)
+    if lazy:
+        Node.populate_nodes_lazily(word_list, cross_length,
+                                   DEFAULT_NEIGHBOR_CACHE_SIZE if neighbor_cache_size is None else neighbor_cache_size)
+    else:
+        Node.populate_nodes_from_word_list(word_list, cross_length)
     Node.find_isolated_nodes()
+    if landmark_count > 0:
+        Node.graph.compute_landmarks(landmark_count)
+    if graph_file is not None and not lazy:
+        Node.graph.save(graph_file)
+
+# Raises ValueError if the words of graph can't be changed in place
+def check_graph_can_change(graph):
+    if isinstance(graph, ShardedWordGraph):
+        raise ValueError("A graph split by word length is read-only, build the shards again to change its words")
+
+# Applies a change to the dictionary of a graph made by create_nodes(), without building it again. Words are
+# removed before any are added. word_list is kept in step: a removed word's place in it is taken by the last word,
+# and added words go on the end. The first change makes an index of where each word is in word_list (and a list
+# of its own, if word_list is the graph's), and after that, a change takes time in proportion to its size.
+def update_words(added_words=(), removed_words=()):
+    global word_list, word_positions
+    # Before word_list is copied, which would load every shard
+    check_graph_can_change(Node.graph)
+    if word_positions is None:
+        if word_list is Node.graph.words or not isinstance(word_list, list):
+            word_list = list(word_list)
+        word_positions = {word: position for position, word in enumerate(word_list)}
+    removed, added = Node.update_words(added_words, removed_words)
+    for word in removed:
+        position = word_positions.pop(word, None)
+        if position is None:
+            continue
+        last_word = word_list.pop()
+        if position < len(word_list):
+            word_list[position] = last_word
+            word_positions[last_word] = position
+    for word in added:
+        if word not in word_positions:
+            word_positions[word] = len(word_list)
+            word_list.append(word)
+
+# Returns the fewest letter changes, additions and removals that turn word1 into word2 (the Levenshtein distance)
+def get_edit_distance(word1, word2):
+    previous = list(range(len(word2) + 1))
+    for i, letter1 in enumerate(word1):
+        current = [i + 1]
+        for j, letter2 in enumerate(word2):
+            current.append(min(previous[j + 1] + 1, current[j] + 1, previous[j] + (letter1 != letter2)))
+        previous = current
+    return previous[-1]
 
 # Return all the words that are one letter away from the one passed in
 def find_matches(word):
@@ -187,7 +1511,11 @@ def is_path_possible(word1, word2):
     node1 = Node.find_node(word1)
     node2 = Node.find_node(word2)
     if node1 is None or node2 is None: return False, False
-    return node1.network_number == node2.network_number, True
+    if node1 is node2: return True, True
+    network_number = node1.network_number
+    # A word on its own has nowhere to go
+    if Node.graph.get_network_size(network_number) == 1: return False, True
+    return network_number == node2.network_number, True
 
 def set_random_seed(seed):
     global the_random_seed
@@ -217,15 +1545,17 @@ def get_word_by_random_wander(src_word, distance):
     node = Node.find_node(src_word)
     if node is None: return
     visted_nodes = [node]
+    visited_ids = {node.id}
     while distance > 0:
         # Attempt to get a neighbor we haven't visited yet
         success = False
         neighbors = node.get_randomized_neighbor_list()
         for n in neighbors:
-            if n not in visted_nodes:
+            if n.id not in visited_ids:
                 node = n
                 success = True
                 visted_nodes.append(node)
+                visited_ids.add(node.id)
                 break
         if not success:
             break